@@ -1,5 +1,26 @@
+import threading
+
 from django.apps import AppConfig
 
 
 class McpChatConfig(AppConfig):
     name = "mcp_chat"
+
+    _mcp_client = None
+    _mcp_client_lock = threading.Lock()
+
+    @property
+    def mcp_client(self):
+        """
+        Shared MCP client, built on first use rather than at import time.
+        The lock makes concurrent first requests share one client (and its
+        worker pools). Building it is cheap: the docs index is built on a
+        background thread, and the API client is created per event loop.
+        """
+        if self._mcp_client is None:
+            with self._mcp_client_lock:
+                if self._mcp_client is None:
+                    from .mcp_client import MCPClient
+
+                    self._mcp_client = MCPClient()
+        return self._mcp_client
@@ -3,9 +3,23 @@ MCP Client - manages conversation with Claude and routes tool calls to MCP serve
 """
 
 import os
+import asyncio
+import hashlib
+import threading
 import anthropic
-from typing import List, Dict, Any, Optional
-import json
+import httpx
+from typing import (
+    List,
+    Dict,
+    Any,
+    Optional,
+    Tuple,
+    AsyncIterator,
+    Callable,
+    Awaitable,
+)
+import orjson
+from cachetools import TTLCache
 from django.conf import settings
 import logging
 
@@ -15,6 +29,50 @@ from .mcp_servers import MCPServer, VoIPDocsServer, WeatherServer
 logger = logging.getLogger(__name__)
 
 
+SYSTEM_PROMPT_TEMPLATE = """You are a helpful assistant with access to multiple tools and resources.
+
+Available Resources:
+{resource_info}
+
+Tool Usage Guidelines:
+- For weather-related queries: Use weather tools (get_weather, etc.)
+- For VoIP, SIP, FreeSWITCH, or telephony topics: Use search_voip_docs tool and get_sip_message_example
+- Always choose the most appropriate tool based on the user's question topic
+- When using documentation, cite specific sources
+
+Choose tools carefully based on the user's actual question topic.
+"""
+
+# Prompt caching breakpoint: everything up to the tagged block is cached
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Conversation size that triggers summarizing the middle turns. The view's
+# settings.MCP_HISTORY_TURNS and MCP_HISTORY_MAX_CHARS window is sized to stay
+# below both limits.
+HISTORY_MAX_MESSAGES = 20
+HISTORY_MAX_TOKENS = 8000
+HISTORY_KEEP_RECENT = 10  # messages kept verbatim at the end
+SUMMARY_MAX_TOKENS = 300
+# Summaries by the exact range of messages they cover, so a range that comes
+# up again is not summarized twice
+SUMMARY_CACHE_SIZE = 128
+SUMMARY_CACHE_TTL = 3600  # seconds
+
+# Tool results longer than this are cut before going back to Claude
+TOOL_RESULT_MAX_CHARS = 4096
+
+# Memoized results of deterministic tools, shared across conversations
+TOOL_CACHE_SIZE = 256
+TOOL_CACHE_TTL = 600  # seconds
+
+# Message Batches polling interval (seconds), doubled until the cap
+BATCH_POLL_INTERVAL = 20
+BATCH_POLL_MAX_INTERVAL = 300
+# Conversations a bulk caller runs interactively at once, to stay clear of
+# rate limits
+BATCH_MAX_CONCURRENT = 8
+
+
 class MCPClient:
     """
     Handles the conversation loop with Claude, including tool calling.
@@ -22,17 +80,69 @@ class MCPClient:
     """
 
     def __init__(self) -> None:
-        self.client = anthropic.Client(
-            api_key=settings.ANTHROPIC_API_KEY,
-            max_retries=3,
-            timeout=60,
-        )
+        # API client, created lazily on the event loop that uses it
+        self._client: Optional[anthropic.AsyncAnthropic] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
         self.model = settings.ANTHROPIC_MODEL
+        self.summary_model = settings.ANTHROPIC_SUMMARY_MODEL
 
         # Initialize MCP servers
         self.servers: Dict[str, MCPServer] = {}
+        self._clean_tools: List[Dict[str, Any]] = []
+        self._tool_to_server: Dict[str, str] = {}
+        self._tool_dispatch: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self._cacheable_tools: set = set()
+        self._tool_cache = TTLCache(maxsize=TOOL_CACHE_SIZE, ttl=TOOL_CACHE_TTL)
+        # TTLCache is not thread-safe, and requests may be served from several
+        # threads (each with its own event loop)
+        self._tool_cache_lock = threading.Lock()
+        self._summary_cache = TTLCache(
+            maxsize=SUMMARY_CACHE_SIZE, ttl=SUMMARY_CACHE_TTL
+        )
+        self._summary_cache_lock = threading.Lock()
+        # (resource versions, rendered prompt)
+        self._system_prompt: Optional[Tuple[Any, str]] = None
+        # (resource versions, filtered resources) for get_all_resources()
+        self._all_resources: Optional[Tuple[Any, List[Dict[str, Any]]]] = None
         self._initialize_servers()
 
+    async def __aenter__(self) -> "MCPClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the API client and any connections held by the servers."""
+        await asyncio.gather(*[server.aclose() for server in self.servers.values()])
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._client_loop = None
+
+    @property
+    def client(self) -> anthropic.AsyncAnthropic:
+        """
+        Persistent HTTP/2 pool for every round-trip of the tool loop.
+        Connections are tied to an event loop, and under WSGI every async view
+        runs on a new one, so a new loop gets a new client.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = anthropic.AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                max_retries=3,
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                http_client=anthropic.DefaultAsyncHttpxClient(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_keepalive_connections=8, keepalive_expiry=30.0
+                    ),
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
     def _initialize_servers(self) -> None:
         """
         Setup all servers based on settings.
@@ -46,40 +156,40 @@ class MCPClient:
         # Weather server
         self.servers["weather"] = WeatherServer()
 
+        # Tool schemas never change after startup, so aggregate them once
         logger.info("MCP servers initialized:")
         for server_name, server in self.servers.items():
             tools = server.get_tools()
             logger.info(f" * {server_name}: {len(tools)} tools")
 
-    def get_all_tools(self) -> List[Dict[str, Any]]:
-        """Aggregate all tools from all servers."""
-        all_tools = []
-
-        for server_name, server in self.servers.items():
-            tools = server.get_tools()
-
-            # Add server metadata to each tool
+            # What the API sees and the routing metadata are kept apart
             for tool in tools:
-                tool["_server"] = server_name  # Track which server owns this tool
-                all_tools.append(tool)
-        return all_tools
+                self._clean_tools.append(
+                    {k: v for k, v in tool.items() if not k.startswith("_")}
+                )
+                self._tool_to_server[tool["name"]] = server_name
 
-    def get_clean_tools_for_api(self) -> List[Dict[str, Any]]:
-        """Get tools without internal metadata for Anthropic API."""
-        clean_tools = []
+                handler = server.get_tool_handler(tool["name"])
+                if handler is not None:
+                    self._tool_dispatch[tool["name"]] = handler
 
-        for server_name, server in self.servers.items():
-            tools = server.get_tools()
+                if tool["name"] in server.deterministic_tools:
+                    self._cacheable_tools.add(tool["name"])
 
-            for tool in tools:
-                # Create a clean copy without internal fields
-                clean_tool = {k: v for k, v in tool.items() if not k.startswith("_")}
-                clean_tools.append(clean_tool)
+        # Tagging the last tool caches the whole tools block
+        if self._clean_tools:
+            self._clean_tools[-1]["cache_control"] = CACHE_CONTROL
 
-        return clean_tools
+    def get_clean_tools_for_api(self) -> List[Dict[str, Any]]:
+        """Get tools without internal metadata for Anthropic API."""
+        return self._clean_tools
 
     def get_all_resources(self) -> List[Dict[str, Any]]:
         """Aggregate all resources from all the servers, filtering for FreeSWITCH/SIP"""
+        version = self._resources_version()
+        if self._all_resources is not None and self._all_resources[0] == version:
+            return self._all_resources[1]
+
         all_resources = []
 
         for server_name, server in self.servers.items():
@@ -90,29 +200,56 @@ class MCPClient:
                 resource_name = resource.get("name", "").lower()
                 # Only include resources with FreeSWITCH or SIP in their names
                 if "freeswitch" in resource_name or "sip" in resource_name:
-                    resource["_server"] = (
-                        server_name  # Track which server owns this resource
-                    )
-                    all_resources.append(resource)
+                    # Copy, servers may hand out their cached resource dicts
+                    all_resources.append({**resource, "_server": server_name})
+
+        self._all_resources = (version, all_resources)
         return all_resources
 
-    async def handle_tool_call(
-        self, tool_name: str, tool_input: Dict[str, Any], server_name: str
-    ) -> Any:
-        """Handle tool calling by routing to the appropriate server."""
+    def _resources_version(self) -> Tuple[Any, ...]:
+        """Changes whenever any server's resource listing changes."""
+        return tuple(server.get_resources_version() for server in self.servers.values())
+
+    async def handle_tool_call(self, tool_name: str, tool_input: Dict[str, Any]) -> Any:
+        """Handle tool calling by routing straight to the owning server's handler."""
 
-        if server_name not in self.servers:
-            return {"error": f"Unknown server: {server_name}"}
+        handler = self._tool_dispatch.get(tool_name)
 
-        server = self.servers[server_name]
+        if handler is None:
+            return {"error": f"Tool {tool_name} not found"}
 
-        logger.info(f"Calling tool {tool_name} on server {server_name}")
+        logger.info(
+            f"Calling tool {tool_name} on server {self._tool_to_server[tool_name]}"
+        )
         logger.info(f" tool input: {tool_input}")
 
-        result = await server.call_tool(tool_name, tool_input)
+        cache_key = None
+        if tool_name in self._cacheable_tools:
+            # Keyed on the server's content too, so edited docs are not
+            # answered from results computed before the edit
+            server = self.servers[self._tool_to_server[tool_name]]
+            cache_key = (
+                tool_name,
+                orjson.dumps(tool_input, option=orjson.OPT_SORT_KEYS),
+                server.get_content_version(),
+            )
+            with self._tool_cache_lock:
+                cached = self._tool_cache.get(cache_key)
+            if cached is not None:
+                logger.info("  Result served from tool cache")
+                return cached
+
+        result = await handler(tool_input)
 
         logger.info(f"  Result: {str(result)[:200]}...")
 
+        # Errors may be transient, only remember successful results
+        if cache_key is not None and not (
+            isinstance(result, dict) and "error" in result
+        ):
+            with self._tool_cache_lock:
+                self._tool_cache[cache_key] = result
+
         return result
 
     async def send_message(
@@ -128,38 +265,70 @@ class MCPClient:
             'response': str, # Final assistance response
             'tool_calls': List[Dict], # Tolls that were called
             'conversation': List[Dict] # Full conversation including tool use
+            'error': str # Only when the tool loop ended without a final answer
             }
         """
 
+        return await self._collect(
+            self.send_message_stream(user_message, conversation_history)
+        )
+
+    async def _collect(self, events: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """send_message's result, from the tool loop's final done or error event."""
+        async for event in events:
+            if event["type"] == "done":
+                return {
+                    "response": event["response"],
+                    "tool_calls": event["tool_calls"],
+                    "conversation": event["conversation"],
+                }
+            if event["type"] == "error":
+                return {
+                    "response": "",
+                    "tool_calls": event["tool_calls"],
+                    "conversation": [],
+                    "error": event["error"],
+                }
+
+    async def send_message_stream(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream message to Claude with MCP tool support.
+        Same conversation loop as send_message, but yields events as they arrive.
+
+        Yields:
+            {'type': 'text_delta', 'text': str} # Partial assistant text, any iteration
+            {'type': 'tool_call', 'tool': str, 'input': Dict} # A tool is about to run
+            {'type': 'done', 'response': str, 'tool_calls': List[Dict], 'conversation': List[Dict]}
+            {'type': 'error', 'error': str, 'tool_calls': List[Dict]} # Instead of done, if the tool loop never finished
+        """
+
         if conversation_history is None:
             conversation_history = []
 
         # Add user message
         messages = conversation_history + [{"role": "user", "content": user_message}]
 
+        async for event in self._tool_loop(messages):
+            yield event
+
+    async def _tool_loop(
+        self, messages: List[Dict[str, Any]], response: Optional[Any] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Call Claude and run the tools it asks for until it gives a final
+        answer, yielding send_message_stream's events. If response is given,
+        it is Claude's reply to messages already received (from the Message
+        Batches API) and stands in for the first call.
+        """
+
         # Get clean tools for API (without internal metadata)
         clean_tools = self.get_clean_tools_for_api()
 
-        # Get tools with metadata for server routing
-        tools_with_metadata = self.get_all_tools()
-
         # Build system prompt with resource information
-        resources = self.get_all_resources()
-        resource_info = self._format_resources(resources)
-
-        system_prompt = f"""You are a helpful assistant with access to multiple tools and resources.
-
-        Available Resources:
-        {resource_info}
-
-        Tool Usage Guidelines:
-        - For weather-related queries: Use weather tools (get_weather, etc.)
-        - For VoIP, SIP, FreeSWITCH, or telephony topics: Use search_voip_docs tool and get_sip_message_example
-        - Always choose the most appropriate tool based on the user's question topic
-        - When using documentation, cite specific sources
-
-        Choose tools carefully based on the user's actual question topic.
-        """
+        system = self._get_system_blocks()
 
         # Track tool calls made
         tool_calls_made = []
@@ -167,20 +336,39 @@ class MCPClient:
         # Conversation loop - handle multiple tool calls
         max_iterations = 5  # Prevent infinite loops
         iteration = 0
+        cache_breakpoint = None
 
         while iteration < max_iterations:
             iteration += 1
 
-            logger.info(f"\n API Call #{iteration}")
-
-            # Call Claude
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=4096,
-                system=system_prompt,
-                tools=clean_tools,
-                messages=messages,
-            )
+            if iteration > 1 or response is None:
+                logger.info(f"\n API Call #{iteration}")
+
+                # Keep the prompt bounded: every call re-sends the whole
+                # conversation
+                if (
+                    len(messages) > HISTORY_MAX_MESSAGES
+                    or self._estimate_tokens(messages) > HISTORY_MAX_TOKENS
+                ):
+                    messages = await self._compact_history(messages)
+
+                # Cache the conversation so far, so the next iteration reuses it
+                cache_breakpoint = self._move_cache_breakpoint(
+                    messages, cache_breakpoint
+                )
+
+                # Call Claude, forwarding text as it is generated
+                async with self.client.messages.stream(
+                    model=self.model,
+                    max_tokens=4096,
+                    system=system,
+                    tools=clean_tools,
+                    messages=messages,
+                ) as stream:
+                    async for text in stream.text_stream:
+                        yield {"type": "text_delta", "text": text}
+
+                    response = await stream.get_final_message()
 
             logger.info(f"Response - Stop reason: {response.stop_reason}")
 
@@ -191,41 +379,55 @@ class MCPClient:
             if response.stop_reason == "tool_use":
                 # Claude wants to call one or more tools
                 tool_results = []
+                tool_blocks = [
+                    content_block
+                    for content_block in response.content
+                    if content_block.type == "tool_use"
+                ]
+
+                # Let the caller show which tools run while they run
+                for content_block in tool_blocks:
+                    yield {
+                        "type": "tool_call",
+                        "tool": content_block.name,
+                        "input": content_block.input,
+                    }
+
+                # Execute the tools concurrently; one failure must not sink the rest
+                results = await asyncio.gather(
+                    *[
+                        self.handle_tool_call(content_block.name, content_block.input)
+                        for content_block in tool_blocks
+                    ],
+                    return_exceptions=True,
+                )
+
+                for content_block, result in zip(tool_blocks, results):
+                    if isinstance(result, Exception):
+                        result = {"error": str(result)}
+
+                    # Compact JSON: the result is billed as input tokens
+                    content = orjson.dumps(result).decode()
+                    if len(content) > TOOL_RESULT_MAX_CHARS:
+                        content = content[:TOOL_RESULT_MAX_CHARS] + "…[truncated]"
+
+                    # Track this tool call
+                    tool_calls_made.append(
+                        {
+                            "tools": content_block.name,
+                            "input": content_block.input,
+                            "result": result,
+                        }
+                    )
 
-                for content_block in response.content:
-                    if content_block.type == "tool_use":
-                        tool_name = content_block.name
-                        tool_input = content_block.input
-                        tool_use_id = content_block.id
-
-                        # Find which server owns this tool
-                        server_name = None
-                        for tool_def in tools_with_metadata:
-                            if tool_def["name"] == tool_name:
-                                server_name = tool_def.get("_server")
-                                break
-
-                        if not server_name:
-                            result = {"error": f"Tool {tool_name} not found"}
-                        else:
-                            # Execute the tool
-                            result = await self.handle_tool_call(
-                                tool_name, tool_input, server_name
-                            )
-
-                        # Track this tool call
-                        tool_calls_made.append(
-                            {"tools": tool_name, "input": tool_input, "result": result}
-                        )
-
-                        # Add tool result to conversation
-                        tool_results.append(
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": tool_use_id,
-                                "content": json.dumps(result, indent=2),
-                            }
-                        )
+                    # Add tool result to conversation
+                    tool_results.append(
+                        {
+                            "type": "tool_result",
+                            "tool_use_id": content_block.id,
+                            "content": content,
+                        }
+                    )
 
                 # Send tool results back to Claude
                 messages.append({"role": "user", "content": tool_results})
@@ -237,16 +439,281 @@ class MCPClient:
                 # Claude is done (stop_reason is "end_turn")
                 # Extract final text response
 
-                final_response = ""
-                for content_block in response.content:
-                    if hasattr(content_block, "text"):
-                        final_response += content_block.text
+                final_response = "".join(
+                    cb.text for cb in response.content if cb.type == "text"
+                )
 
-                return {
+                yield {
+                    "type": "done",
                     "response": final_response,
                     "tool_calls": tool_calls_made,
                     "conversation": messages,
                 }
+                return
+
+        # Claude still wanted tools when the iterations ran out
+        yield {
+            "type": "error",
+            "error": f"No final answer after {max_iterations} tool rounds",
+            "tool_calls": tool_calls_made,
+        }
+
+    async def send_messages_batch(
+        self, user_messages: List[str], batch: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Send independent messages for non-interactive callers (bulk evaluation).
+
+        With batch=True the first turn of every message goes through the Message
+        Batches API (half the cost, but results may take minutes). Responses that
+        ask for a tool continue from there in the interactive tool loop.
+        With batch=False each message is sent through send_message directly.
+        Either way, at most BATCH_MAX_CONCURRENT conversations are interactive
+        at once.
+
+        Returns one send_message-style result per user message, in order.
+        """
+        limit = asyncio.Semaphore(BATCH_MAX_CONCURRENT)
+
+        async def send(user_message: str) -> Dict[str, Any]:
+            async with limit:
+                return await self.send_message(user_message)
+
+        if not batch:
+            return list(await asyncio.gather(*[send(m) for m in user_messages]))
+
+        system = self._get_system_blocks()
+        clean_tools = self.get_clean_tools_for_api()
+
+        message_batch = await self.client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": f"message-{i}",
+                    "params": {
+                        "model": self.model,
+                        "max_tokens": 4096,
+                        "system": system,
+                        "tools": clean_tools,
+                        "messages": [{"role": "user", "content": user_message}],
+                    },
+                }
+                for i, user_message in enumerate(user_messages)
+            ]
+        )
+        logger.info(f"Created message batch {message_batch.id}")
+
+        # Poll with exponential backoff until every request has been processed
+        delay = BATCH_POLL_INTERVAL
+        while message_batch.processing_status != "ended":
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BATCH_POLL_MAX_INTERVAL)
+            message_batch = await self.client.messages.batches.retrieve(
+                message_batch.id
+            )
+
+        batch_results = {}
+        async for entry in await self.client.messages.batches.results(message_batch.id):
+            batch_results[entry.custom_id] = entry.result
+
+        async def finish(i: int, user_message: str) -> Dict[str, Any]:
+            result = batch_results.get(f"message-{i}")
+
+            if result is None or result.type != "succeeded":
+                status = result.type if result is not None else "missing"
+                return {
+                    "response": "",
+                    "tool_calls": [],
+                    "conversation": [],
+                    "error": f"Batch request {status}",
+                }
+
+            response = result.message
+            if response.stop_reason == "tool_use":
+                # Tools need the interactive loop, which picks up from the batch
+                # reply instead of paying for the first turn again
+                messages = [{"role": "user", "content": user_message}]
+                async with limit:
+                    return await self._collect(self._tool_loop(messages, response))
+
+            final_response = "".join(
+                cb.text for cb in response.content if cb.type == "text"
+            )
+
+            return {
+                "response": final_response,
+                "tool_calls": [],
+                "conversation": [
+                    {"role": "user", "content": user_message},
+                    {"role": "assistant", "content": response.content},
+                ],
+            }
+
+        return list(
+            await asyncio.gather(*[finish(i, m) for i, m in enumerate(user_messages)])
+        )
+
+    async def _compact_history(
+        self, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Replace the middle of a long conversation with a short summary.
+        Keeps the first user message and the recent turns verbatim. The recent
+        turns must start at a plain user message, so no tool_result loses its
+        tool_use.
+        """
+        start = max(2, len(messages) - HISTORY_KEEP_RECENT)
+        while start < len(messages) and not self._is_plain_user_message(
+            messages[start]
+        ):
+            start += 1
+
+        if start >= len(messages) or not self._is_plain_user_message(messages[0]):
+            return messages
+
+        middle = messages[1:start]
+        transcript = "\n".join(
+            f"{message['role']}: {self._message_text(message)}" for message in middle
+        )
+
+        # Keyed on the whole excerpt: only an identical range may reuse a
+        # summary, so nothing from another conversation can leak in
+        cache_key = hashlib.blake2b(transcript.encode(), digest_size=16).digest()
+        with self._summary_cache_lock:
+            summary_text = self._summary_cache.get(cache_key)
+
+        if summary_text is None:
+            summary = await self.client.messages.create(
+                model=self.summary_model,
+                max_tokens=SUMMARY_MAX_TOKENS,
+                temperature=0,
+                system="Summarize this conversation excerpt in a few sentences. "
+                "Keep facts, tool findings and open questions.",
+                messages=[{"role": "user", "content": transcript}],
+            )
+            summary_text = "".join(
+                block.text for block in summary.content if block.type == "text"
+            )
+            with self._summary_cache_lock:
+                self._summary_cache[cache_key] = summary_text
+
+            logger.info(f"Summarized {len(middle)} messages of conversation history")
+
+        return (
+            [messages[0]]
+            + [
+                {
+                    "role": "assistant",
+                    "content": f"Conversation summary so far: {summary_text}",
+                }
+            ]
+            + messages[start:]
+        )
+
+    def _is_plain_user_message(self, message: Dict[str, Any]) -> bool:
+        """User turn typed by the user (not a list of tool results)."""
+        if message["role"] != "user":
+            return False
+        content = message["content"]
+        return isinstance(content, str) or not any(
+            self._block_field(block, "type") == "tool_result" for block in content
+        )
+
+    def _estimate_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Rough size of messages, at about 4 characters a token. Every check
+        uses this same measure (the API's usage also counts the system prompt,
+        tools and output, so mixing the two would compare different things).
+        """
+        size = 0
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, str):
+                size += len(content)
+                continue
+            for block in content:
+                for field in ("text", "input", "content"):
+                    value = self._block_field(block, field)
+                    if value is not None:
+                        size += len(value if isinstance(value, str) else str(value))
+        return size // 4
+
+    def _message_text(self, message: Dict[str, Any]) -> str:
+        """Flatten a message (text, tool calls, tool results) into plain text."""
+        content = message["content"]
+        if isinstance(content, str):
+            return content
+
+        parts = []
+        for block in content:
+            block_type = self._block_field(block, "type")
+            if block_type == "text":
+                parts.append(self._block_field(block, "text"))
+            elif block_type == "tool_use":
+                parts.append(
+                    f"[called {self._block_field(block, 'name')}"
+                    f"({self._block_field(block, 'input')})]"
+                )
+            elif block_type == "tool_result":
+                result = str(self._block_field(block, "content"))
+                parts.append(f"[tool result: {result[:500]}]")
+        return " ".join(parts)
+
+    def _block_field(self, block: Any, field: str) -> Any:
+        """Read a field from an SDK content block or a plain dict block."""
+        if isinstance(block, dict):
+            return block.get(field)
+        return getattr(block, field, None)
+
+    def _get_system_blocks(self) -> List[Dict[str, Any]]:
+        """System prompt as a cacheable text block."""
+        return [
+            {
+                "type": "text",
+                "text": self.get_system_prompt(),
+                "cache_control": CACHE_CONTROL,
+            }
+        ]
+
+    def _move_cache_breakpoint(
+        self, messages: List[Dict[str, Any]], previous: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Tag the last content block of the conversation for prompt caching.
+
+        Only the newest block keeps the tag, as the API limits the number of
+        breakpoints per request. Returns the tagged block.
+        """
+        last_message = messages[-1]
+        if isinstance(last_message["content"], str):
+            last_message["content"] = [
+                {"type": "text", "text": last_message["content"]}
+            ]
+
+        if previous is not None:
+            previous.pop("cache_control", None)
+
+        block = last_message["content"][-1]
+        block["cache_control"] = CACHE_CONTROL
+        return block
+
+    def get_system_prompt(self) -> str:
+        """System prompt with the resource listing, re-rendered only when it changes."""
+        version = self._resources_version()
+        if self._system_prompt is None or self._system_prompt[0] != version:
+            resource_info = self._format_resources(self.get_all_resources())
+            self._system_prompt = (
+                version,
+                SYSTEM_PROMPT_TEMPLATE.format(resource_info=resource_info),
+            )
+        return self._system_prompt[1]
+
+    def invalidate_resources(self) -> None:
+        """
+        Re-render the resource listing on the next message and forget memoized
+        tool results (e.g. docs changed).
+        """
+        self._system_prompt = None
+        self._all_resources = None
+        with self._tool_cache_lock:
+            self._tool_cache.clear()
 
     def _format_resources(self, resources: List[Dict[str, Any]]) -> str:
         """Format resources for system prompt"""
@@ -2,47 +2,467 @@
 MCP Server definitions with robust PDF extraction
 """
 
-from typing import List, Dict, Any, Tuple
+from typing import (
+    List,
+    Dict,
+    Any,
+    Tuple,
+    Iterator,
+    Optional,
+    Mapping,
+    Callable,
+    Awaitable,
+    Final,
+)
+from textwrap import dedent
+from types import MappingProxyType
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import islice
+import asyncio
+import hashlib
+import logging
+import mmap
 import os
+import re
+import shutil
+import threading
 from pathlib import Path
+import httpx
+import orjson
+import pymupdf
 import pypdf
 import pdfplumber
 import subprocess
 import tempfile
+from cachetools import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+# Search index tokens: lowercase alphanumeric runs
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NEWLINE_RE = re.compile(rb"\n")
+
+# Bumped whenever the saved index layout changes
+_INDEX_FORMAT = 4
+
+
+def _read_cached_text(path: str) -> str:
+    """
+    Contents of an extraction cache file. Not memoized: the index reads
+    these through mmap, and whole PDF texts would otherwise stay in memory.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=32)
+def _read_doc_text(path: str, mtime_ns: int) -> str:
+    """Contents of a text doc; mtime_ns is part of the key so edits are seen."""
+    with open(path, "r") as f:
+        return f.read()
+
+
+# PDF page extraction is CPU bound, so pages are split across processes
+_EXTRACT_WORKERS = min(os.cpu_count() or 1, 4)
+# Below this many pages, handing work to other processes costs more than it saves
+_POOL_MIN_PAGES = 10
+
+
+def _pypdf_reader_pages(pdf_reader: Any, first: int, last: int) -> List[str]:
+    """Text of pages first..last-1 of an open pypdf reader."""
+    text_content = []
+    # Walk the page sequence instead of resolving pages[i] one index at a time
+    pages = islice(pdf_reader.pages, first, last)
+    for page_num, page in enumerate(pages, first):
+        try:
+            page_text = page.extract_text()
+
+            if page_text and page_text.strip():
+                text_content.append(f"--- Page {page_num + 1} ---\n{page_text}")
+        except Exception as e:
+            logger.debug("Error on page %s: %s", page_num + 1, e)
+    return text_content
+
+
+def _pypdf_pages(pdf_path: str, first: int, last: int) -> List[str]:
+    """Text of pages first..last-1 via pypdf (runs in a worker process)."""
+    with open(pdf_path, "rb") as file:
+        return _pypdf_reader_pages(pypdf.PdfReader(file), first, last)
+
+
+def _pdfplumber_doc_pages(pdf: Any, first: int, last: int) -> List[str]:
+    """Text of pages first..last-1 of an open pdfplumber document."""
+    text_content = []
+    for page_num in range(first, last):
+        try:
+            page_text = pdf.pages[page_num].extract_text()
+
+            if page_text and page_text.strip():
+                text_content.append(f"--- Page {page_num + 1} ---\n{page_text}")
+        except Exception as e:
+            logger.debug("Error on page %s: %s", page_num + 1, e)
+    return text_content
+
+
+def _pdfplumber_pages(pdf_path: str, first: int, last: int) -> List[str]:
+    """Text of pages first..last-1 via pdfplumber (runs in a worker process)."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return _pdfplumber_doc_pages(pdf, first, last)
+
+
+# Example SIP messages, built once at import and shared read-only
+_SIP_EXAMPLES: Final[Mapping[str, str]] = MappingProxyType(
+    {
+        "INVITE": dedent("""\
+            INVITE sip:bob@biloxi.com SIP/2.0
+            Via: SIP/2.0/UDP pc33.atlanta.com;branch=z9hG4bKnashds8
+            Max-Forwards: 70
+            To: Bob <sip:bob@biloxi.com>
+            From: Alice <sip:alice@atlanta.com>;tag=1928301774
+            Call-ID: a84b4c76e66710@pc33.atlanta.com
+            CSeq: 314159 INVITE
+            Contact: <sip:alice@pc33.atlanta.com>
+            Content-Type: application/sdp
+            Content-Length: 142
+
+            (SDP content here)"""),
+        "REGISTER": dedent("""\
+            REGISTER sip:registrar.biloxi.com SIP/2.0
+            Via: SIP/2.0/UDP bobspc.biloxi.com:5060;branch=z9hG4bKnashds7
+            Max-Forwards: 70
+            To: Bob <sip:bob@biloxi.com>
+            From: Bob <sip:bob@biloxi.com>;tag=456248
+            Call-ID: 843817637684230@998sdasdh09
+            CSeq: 1826 REGISTER
+            Contact: <sip:bob@192.0.2.4>
+            Expires: 7200
+            Content-Length: 0"""),
+        "BYE": dedent("""\
+            BYE sip:alice@pc33.atlanta.com SIP/2.0
+            Via: SIP/2.0/UDP 192.0.2.4;branch=z9hG4bKnashds10
+            Max-Forwards: 70
+            From: Bob <sip:bob@biloxi.com>;tag=a6c85cf
+            To: Alice <sip:alice@atlanta.com>;tag=1928301774
+            Call-ID: a84b4c76e66710
+            CSeq: 231 BYE
+            Content-Length: 0"""),
+        "ACK": dedent("""\
+            ACK sip:bob@192.0.2.4 SIP/2.0
+            Via: SIP/2.0/UDP pc33.atlanta.com;branch=z9hG4bKnashds9
+            Max-Forwards: 70
+            To: Bob <sip:bob@biloxi.com>;tag=a6c85cf
+            From: Alice <sip:alice@atlanta.com>;tag=1928301774
+            Call-ID: a84b4c76e66710@pc33.atlanta.com
+            CSeq: 314159 ACK
+            Content-Length: 0"""),
+        "CANCEL": dedent("""\
+            CANCEL sip:bob@biloxi.com SIP/2.0
+            Via: SIP/2.0/UDP pc33.atlanta.com;branch=z9hG4bKnashds8
+            Max-Forwards: 70
+            To: Bob <sip:bob@biloxi.com>
+            From: Alice <sip:alice@atlanta.com>;tag=1928301774
+            Call-ID: a84b4c76e66710@pc33.atlanta.com
+            CSeq: 314159 CANCEL
+            Content-Length: 0"""),
+        "OPTIONS": dedent("""\
+            OPTIONS sip:bob@biloxi.com SIP/2.0
+            Via: SIP/2.0/UDP pc33.atlanta.com;branch=z9hG4bKnashds11
+            Max-Forwards: 70
+            To: <sip:bob@biloxi.com>
+            From: Alice <sip:alice@atlanta.com>;tag=1928301774
+            Call-ID: a84b4c76e66710
+            CSeq: 63104 OPTIONS
+            Contact: <sip:alice@pc33.atlanta.com>
+            Accept: application/sdp
+            Content-Length: 0"""),
+    }
+)
+
+
+# Tool schemas never change, so they are built once and shared
+_VOIP_TOOLS: Final[List[Dict[str, Any]]] = [
+    {
+        "name": "search_voip_docs",
+        "description": "Search through VoIP documentation for specific topics. Returns relevant excerpts from SIP RFCs, FreeSWITCH docs, etc. Supports both text files and PDF documents.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query (e.g., 'SIP INVITE method', 'FreeSWITCH dialplan', 'call routing')",
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of results to return",
+                    "default": 3,
+                },
+            },
+            "required": ["query"],
+        },
+    },
+    {
+        "name": "get_sip_message_example",
+        "description": "Get example SIP messages for different scenarios (INVITE, REGISTER, BYE, etc.)",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "message_type": {
+                    "type": "string",
+                    "enum": [
+                        "INVITE",
+                        "REGISTER",
+                        "BYE",
+                        "CANCEL",
+                        "ACK",
+                        "OPTIONS",
+                    ],
+                    "description": "Type of SIP message",
+                }
+            },
+            "required": ["message_type"],
+        },
+    },
+    {
+        "name": "list_available_docs",
+        "description": "List all available VoIP documentation files in the system",
+        "input_schema": {"type": "object", "properties": {}, "required": []},
+    },
+]
+
+_WEATHER_TOOLS: Final[List[Dict[str, Any]]] = [
+    {
+        "name": "get_weather",
+        "description": "Get current weather for a location using Open-Meteo API",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "latitude": {
+                    "type": "number",
+                    "description": "Latitude coordinate",
+                },
+                "longitude": {
+                    "type": "number",
+                    "description": "Longitude coordinate",
+                },
+                "location_name": {
+                    "type": "string",
+                    "description": "Human-readable location name (optional)",
+                },
+            },
+            "required": ["latitude", "longitude"],
+        },
+    }
+]
 
 
 class MCPServer:
     """Base class for MCP servers"""
 
+    # Tools whose result depends only on their arguments (safe to memoize)
+    deterministic_tools: frozenset = frozenset()
+
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
 
+        # Tool name -> async handler taking the tool arguments
+        self._dispatch: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+
     def get_tools(self) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
     def get_resources(self) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
+    def get_resources_version(self) -> Any:
+        """Value that changes whenever get_resources() would return something new."""
+        return None
+
+    def get_content_version(self) -> Any:
+        """Value that changes whenever a deterministic tool could answer differently."""
+        return None
+
+    def get_tool_handler(
+        self, tool_name: str
+    ) -> Optional[Callable[[Dict[str, Any]], Awaitable[Any]]]:
+        return self._dispatch.get(tool_name)
+
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
-        raise NotImplementedError
+        """Execute tool calls"""
+        handler = self._dispatch.get(tool_name)
+
+        if handler is None:
+            return {"error": f"Unknown tool: {tool_name}"}
+
+        return await handler(arguments)
 
     async def read_resource(self, uri: str) -> str:
         raise NotImplementedError
 
+    async def aclose(self) -> None:
+        """Release any resources (connections, etc.) held by the server."""
+        pass
+
+
+def _map_file(path: str) -> Any:
+    """Read-only mmap of a file (empty files cannot be mapped, use b'')."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _DocIndex:
+    """
+    Inverted index over the docs: token -> [(file, line_no)].
+    Lines are not kept in memory, they are read back from a mmap of the
+    doc's text under .cache using the byte offset where each line starts.
+    The docs themselves are never mapped: truncating a mapped file kills the
+    reading process (SIGBUS), and cache files are only ever replaced whole.
+    An index is not changed after it is built, so a search can keep using
+    one while a newer index replaces it.
+    """
+
+    def __init__(
+        self,
+        manifest: Optional[Dict[str, Tuple[int, int]]],
+        sources: Dict[str, str],
+        postings: Dict[str, List[Tuple[str, int]]],
+        line_starts: Dict[str, array],
+    ):
+        self.manifest = manifest
+        self.sources = sources
+        self.postings = postings
+        self.line_starts = line_starts
+        self.vocab = sorted(postings)
+
+        # All vocab tokens in one newline-separated buffer, plus where each starts
+        self.vocab_blob = "\n".join(self.vocab) + "\n"
+        self.vocab_starts = array("q", [0])
+        for token in self.vocab[:-1]:
+            self.vocab_starts.append(self.vocab_starts[-1] + len(token) + 1)
+
+        # Map the documents once; the OS page cache serves later reads. The
+        # mappings are closed when the index is garbage collected.
+        self.maps: Dict[str, Any] = {}
+        for name, source in sources.items():
+            try:
+                self.maps[name] = _map_file(source)
+            except Exception as e:
+                logger.warning("Error mapping %s: %s", name, e)
 
-class VoIPDocsServer(MCPServer):
-    """MCP server for VoIP documentation with robust PDF extraction"""
+    def doc_bytes(self, name: str, first: int, last: int) -> bytes:
+        """Raw lines first..last-1 of an indexed doc, clamped to the file."""
+        line_starts = self.line_starts[name]
+        first = max(0, first)
+        last = min(last, len(line_starts) - 1)
+        return self.maps[name][line_starts[first] : line_starts[last] - 1]
 
-    def __init__(self, docs_dir: str):
-        super().__init__(
-            name="voip-docs",
-            description="Access to VoIP and SIP protocol documentation",
-        )
-        self.docs_dir = Path(docs_dir)
-        print(f"VoIP Docs Directory: {self.docs_dir}")
+    def doc_lines(self, name: str, first: int, last: int) -> str:
+        """Text of lines first..last-1 of an indexed doc, clamped to the file."""
+        return self.doc_bytes(name, first, last).decode(errors="replace")
+
+    def expand_term(self, term: str, whole_start: bool, whole_end: bool) -> List[str]:
+        """
+        Index tokens a query term can match inside a substring match.
+        A term in the middle of the query must be a whole token, but the first
+        and last terms may be cut off (e.g. 'invite' also matches 'invites').
+        """
+        if whole_start and whole_end:
+            return [term] if term in self.postings else []
+
+        if whole_start:
+            tokens = []
+            i = bisect_left(self.vocab, term)
+            while i < len(self.vocab) and self.vocab[i].startswith(term):
+                tokens.append(self.vocab[i])
+                i += 1
+            return tokens
+
+        # Partial terms: one compiled scan over the flat vocab buffer instead of
+        # testing every token in Python. Tokens never contain '\n', so a match
+        # always falls inside a single token.
+        pattern = re.escape(term) + ("\n" if whole_end else "")
+        indices = {
+            bisect_right(self.vocab_starts, m.start()) - 1
+            for m in re.finditer(pattern, self.vocab_blob)
+        }
+        return [self.vocab[i] for i in sorted(indices)]
+
+    def search(self, query_lower: str) -> Iterator[Tuple[str, List[int]]]:
+        """
+        Find lines of the docs containing query_lower.
+        Yields (file, line numbers) per file that has matches, text docs first.
+        """
+        terms = list(_TOKEN_RE.finditer(query_lower))
+
+        if terms:
+            # Narrow down to lines containing every term, then verify the phrase
+            candidates = None
+            for m in terms:
+                lines = set()
+                for token in self.expand_term(
+                    m.group(), m.start() > 0, m.end() < len(query_lower)
+                ):
+                    lines.update(self.postings[token])
+
+                candidates = lines if candidates is None else candidates & lines
+                if not candidates:
+                    return
+        else:
+            # Nothing to look up (e.g. punctuation-only query), so scan the raw
+            # bytes; without letters in the query there is no case to fold
+            pattern = re.compile(re.escape(query_lower.encode()))
+            candidates = set()
+            for name, data in self.maps.items():
+                line_starts = self.line_starts[name]
+                for m in pattern.finditer(data):
+                    candidates.add((name, bisect_right(line_starts, m.start()) - 1))
+
+        # One case-insensitive pattern checks each candidate line, instead of
+        # lowercasing every line. ASCII folds the same way in bytes, so those
+        # queries are checked against the mapped bytes without decoding.
+        if query_lower.isascii():
+            phrase = re.compile(re.escape(query_lower.encode()), re.IGNORECASE)
+            read_line = self.doc_bytes
+        else:
+            phrase = re.compile(re.escape(query_lower), re.IGNORECASE)
+            read_line = self.doc_lines
 
-    def _validate_pdf(self, pdf_path: Path) -> Tuple[bool, str]:
+        matches = defaultdict(list)
+        for name, line_no in sorted(candidates):
+            if name not in self.maps:
+                continue
+            if phrase.search(read_line(name, line_no, line_no + 1)):
+                matches[name].append(line_no)
+
+        yield from sorted(matches.items(), key=lambda item: item[0].endswith(".pdf"))
+
+
+class _PdfExtractor:
+    """
+    Text extraction from PDFs, trying several engines in turn.
+    Holds no per-PDF state. With a process pool, long PDFs have their pages
+    split across it; without one (as inside a pool worker) all work is done
+    in the calling process.
+    """
+
+    def __init__(
+        self,
+        pdftotext: Optional[str],
+        gs: Optional[str],
+        extract_pool: Optional[ProcessPoolExecutor] = None,
+    ):
+        self._pdftotext = pdftotext
+        self._gs = gs
+        self._extract_pool = extract_pool
+
+    def validate(self, pdf_path: Path) -> Tuple[bool, str]:
         """
         Validate PDF file before extraction.
         Returns: (is_valid, message)
@@ -70,160 +490,190 @@ class VoIPDocsServer(MCPServer):
             return False, f"Cannot read file: {str(e)}"
 
     def _extract_with_pdftotext(
-        self, pdf_path: Path, max_pages: int = 30
+        self, pdf_path: Path, max_pages: int = 30, min_chars: int = 500
     ) -> Tuple[str, bool]:
         """
         Extract using pdftotext command-line tool (if available).
         This is often more robust than Python libraries.
         """
         try:
-            print(f"  Trying pdftotext (command-line)...")
-
-            # Check if pdftotext is available
-            result = subprocess.run(
-                ["which", "pdftotext"], capture_output=True, text=True
-            )
+            logger.debug("Trying pdftotext (command-line)...")
 
-            if result.returncode != 0:
-                print(f"  pdftotext not installed (install via: brew install poppler)")
+            if not self._pdftotext:
+                logger.debug(
+                    "pdftotext not installed (install via: brew install poppler)"
+                )
                 return "", False
 
-            # Create temp file for output
-            with tempfile.NamedTemporaryFile(
-                mode="w+", suffix=".txt", delete=False
-            ) as tmp:
-                tmp_path = tmp.name
-
             try:
-                # Run pdftotext
-                subprocess.run(
-                    ["pdftotext", "-l", str(max_pages), str(pdf_path), tmp_path],
+                # Run pdftotext, writing the text to stdout ("-")
+                result = subprocess.run(
+                    [self._pdftotext, "-l", str(max_pages), str(pdf_path), "-"],
                     check=True,
                     capture_output=True,
                     timeout=30,
                 )
+                text = result.stdout.decode("utf-8", errors="ignore")
 
-                # Read extracted text
-                with open(tmp_path, "r", encoding="utf-8", errors="ignore") as f:
-                    text = f.read()
-
-                # Clean up
-                os.unlink(tmp_path)
-
-                if len(text) > 500:
-                    print(f"  pdftotext extracted {len(text)} characters")
+                if len(text) > min_chars:
+                    logger.debug("pdftotext extracted %d characters", len(text))
                     return text, True
                 else:
-                    print(f"  pdftotext extracted only {len(text)} characters")
+                    logger.debug("pdftotext extracted only %d characters", len(text))
                     return text, False
 
             except subprocess.TimeoutExpired:
-                print(f"  pdftotext timed out")
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+                logger.debug("pdftotext timed out")
                 return "", False
             except subprocess.CalledProcessError as e:
-                print(
-                    f"  pdftotext failed: {e.stderr.decode() if e.stderr else 'Unknown error'}"
+                logger.debug(
+                    "pdftotext failed: %s",
+                    e.stderr.decode() if e.stderr else "Unknown error",
                 )
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
                 return "", False
 
         except Exception as e:
-            print(f"  pdftotext error: {str(e)}")
+            logger.debug("pdftotext error: %s", e)
             return "", False
 
-    def _extract_pdf_with_pypdf(
-        self, pdf_path: Path, max_pages: int = 30
+    def _extract_pdf_with_pymupdf(
+        self, doc: Optional[Any], max_pages: int = 30, min_chars: int = 500
     ) -> Tuple[str, bool]:
-        """Extract text using pypdf library."""
+        """
+        Extract text using PyMuPDF (C MuPDF engine, no subprocess).
+        doc is the caller's open document, or None if PyMuPDF could not open
+        the PDF.
+        """
+        if doc is None:
+            return "", False
+
         try:
-            print(f"  Trying pypdf extraction...")
+            logger.debug("Trying PyMuPDF extraction...")
             text_content = []
 
-            with open(pdf_path, "rb") as file:
-                pdf_reader = pypdf.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                pages_to_extract = min(max_pages, total_pages)
+            total_pages = doc.page_count
+            pages_to_extract = min(max_pages, total_pages)
+
+            logger.debug(
+                "PDF has %s pages, extracting first %s",
+                total_pages,
+                pages_to_extract,
+            )
+
+            for page_num in range(pages_to_extract):
+                try:
+                    page_text = doc.load_page(page_num).get_text("text")
+
+                    if page_text and page_text.strip():
+                        text_content.append(f"--- Page {page_num + 1} ---\n{page_text}")
+                except Exception as e:
+                    logger.debug("Error on page %s: %s", page_num + 1, e)
+                    continue
+
+            result = "\n\n".join(text_content)
 
-                print(
-                    f"  PDF has {total_pages} pages, extracting first {pages_to_extract}"
+            if len(result) > min_chars:
+                logger.debug(
+                    "PyMuPDF extracted %d characters from %d pages",
+                    len(result),
+                    len(text_content),
                 )
+                return result, True
+            else:
+                logger.debug("PyMuPDF extracted only %d characters", len(result))
+                return result, False
 
-                for page_num in range(pages_to_extract):
-                    try:
-                        page = pdf_reader.pages[page_num]
-                        page_text = page.extract_text()
-
-                        if page_text and page_text.strip():
-                            text_content.append(
-                                f"--- Page {page_num + 1} ---\n{page_text}"
-                            )
-                    except Exception as e:
-                        print(f"  Error on page {page_num + 1}: {str(e)}")
-                        continue
+        except Exception as e:
+            logger.debug("PyMuPDF failed: %s", e)
+            return "", False
 
-                result = "\n\n".join(text_content)
+    def _extract_pdf_with_pypdf(
+        self, pdf_path: Path, data: Any, max_pages: int = 30, min_chars: int = 500
+    ) -> Tuple[str, bool]:
+        """
+        Extract text using pypdf library.
+        The document is parsed once from the shared buffer; only worker
+        processes open pdf_path themselves.
+        """
+        try:
+            logger.debug("Trying pypdf extraction...")
 
-                if len(result) > 500:
-                    print(
-                        f"  pypdf extracted {len(result)} characters from {len(text_content)} pages"
-                    )
-                    return result, True
-                else:
-                    print(f"   pypdf extracted only {len(result)} characters")
-                    return result, False
+            pdf_reader = pypdf.PdfReader(data)
+            total_pages = len(pdf_reader.pages)
+            pages_to_extract = min(max_pages, total_pages)
+
+            logger.debug(
+                "PDF has %s pages, extracting first %s", total_pages, pages_to_extract
+            )
+
+            text_content = self._extract_pages(
+                _pypdf_pages,
+                partial(_pypdf_reader_pages, pdf_reader),
+                pdf_path,
+                pages_to_extract,
+            )
+            result = "\n\n".join(text_content)
+
+            if len(result) > min_chars:
+                logger.debug(
+                    "pypdf extracted %d characters from %d pages",
+                    len(result),
+                    len(text_content),
+                )
+                return result, True
+            else:
+                logger.debug("pypdf extracted only %d characters", len(result))
+                return result, False
 
         except pypdf.errors.PdfReadError as e:
-            print(f"  ❌ pypdf failed (PDF read error): {str(e)}")
+            logger.debug("pypdf failed (PDF read error): %s", e)
             return "", False
         except Exception as e:
-            print(f"  ❌ pypdf failed: {str(e)}")
+            logger.debug("pypdf failed: %s", e)
             return "", False
 
     def _extract_pdf_with_pdfplumber(
-        self, pdf_path: Path, max_pages: int = 30
+        self, pdf_path: Path, data: Any, max_pages: int = 30, min_chars: int = 500
     ) -> Tuple[str, bool]:
-        """Extract text using pdfplumber library."""
+        """
+        Extract text using pdfplumber library.
+        The document is parsed once from the shared buffer; only worker
+        processes open pdf_path themselves.
+        """
         try:
-            print(f"  Trying pdfplumber extraction...")
-            text_content = []
+            logger.debug("Trying pdfplumber extraction...")
 
-            with pdfplumber.open(pdf_path) as pdf:
+            with pdfplumber.open(data) as pdf:
                 total_pages = len(pdf.pages)
                 pages_to_extract = min(max_pages, total_pages)
 
-                print(
-                    f"  PDF has {total_pages} pages, extracting first {pages_to_extract}"
+                logger.debug(
+                    "PDF has %s pages, extracting first %s",
+                    total_pages,
+                    pages_to_extract,
                 )
 
-                for page_num in range(pages_to_extract):
-                    try:
-                        page = pdf.pages[page_num]
-                        page_text = page.extract_text()
-
-                        if page_text and page_text.strip():
-                            text_content.append(
-                                f"--- Page {page_num + 1} ---\n{page_text}"
-                            )
-                    except Exception as e:
-                        print(f"  Error on page {page_num + 1}: {str(e)}")
-                        continue
-
-                result = "\n\n".join(text_content)
+                text_content = self._extract_pages(
+                    _pdfplumber_pages,
+                    partial(_pdfplumber_doc_pages, pdf),
+                    pdf_path,
+                    pages_to_extract,
+                )
+            result = "\n\n".join(text_content)
 
-                if len(result) > 500:
-                    print(
-                        f" pdfplumber extracted {len(result)} characters from {len(text_content)} pages"
-                    )
-                    return result, True
-                else:
-                    print(f"  pdfplumber extracted only {len(result)} characters")
-                    return result, False
+            if len(result) > min_chars:
+                logger.debug(
+                    "pdfplumber extracted %d characters from %d pages",
+                    len(result),
+                    len(text_content),
+                )
+                return result, True
+            else:
+                logger.debug("pdfplumber extracted only %d characters", len(result))
+                return result, False
 
         except Exception as e:
-            print(f"  pdfplumber failed: {str(e)}")
+            logger.debug("pdfplumber failed: %s", e)
             return "", False
 
     def _try_repair_pdf(self, pdf_path: Path) -> Tuple[Path, bool]:
@@ -232,14 +682,11 @@ class VoIPDocsServer(MCPServer):
         Returns: (repaired_pdf_path, success)
         """
         try:
-            print(f"  Attempting PDF repair with ghostscript...")
-
-            # Check if gs is available
-            result = subprocess.run(["which", "gs"], capture_output=True, text=True)
+            logger.debug("Attempting PDF repair with ghostscript...")
 
-            if result.returncode != 0:
-                print(
-                    f"  ghostscript not installed (install via: brew install ghostscript)"
+            if not self._gs:
+                logger.debug(
+                    "ghostscript not installed (install via: brew install ghostscript)"
                 )
                 return pdf_path, False
 
@@ -250,7 +697,7 @@ class VoIPDocsServer(MCPServer):
             # Run ghostscript to repair
             subprocess.run(
                 [
-                    "gs",
+                    self._gs,
                     "-o",
                     str(repaired_path),
                     "-sDEVICE=pdfwrite",
@@ -262,71 +709,123 @@ class VoIPDocsServer(MCPServer):
                 timeout=60,
             )
 
-            print(f" PDF repaired, saved to temp file")
+            logger.debug("PDF repaired, saved to temp file")
             return repaired_path, True
 
         except subprocess.TimeoutExpired:
-            print(f"  PDF repair timed out")
+            logger.debug("PDF repair timed out")
             return pdf_path, False
         except subprocess.CalledProcessError as e:
-            print(
-                f" PDF repair failed: {e.stderr.decode() if e.stderr else 'Unknown error'}"
+            logger.debug(
+                "PDF repair failed: %s",
+                e.stderr.decode() if e.stderr else "Unknown error",
             )
             return pdf_path, False
         except Exception as e:
-            print(f"  PDF repair error: {str(e)}")
+            logger.debug("PDF repair error: %s", e)
             return pdf_path, False
 
-    def _extract_pdf_text(self, pdf_path: Path) -> str:
+    def extract_text(self, pdf_path: Path) -> str:
         """
         Extract text from PDF using multiple methods with fallback.
 
         Strategy:
         1. Validate PDF file
-        2. Try command-line pdftotext (most robust)
-        3. Try pypdf
-        4. Try pdfplumber
-        5. If all fail and PDF seems corrupted, try repair then re-extract
+        2. Try PyMuPDF (fastest)
+        3. Try command-line pdftotext (most robust)
+        4. Try pypdf
+        5. Try pdfplumber
+        6. If all fail and PDF seems corrupted, try repair then re-extract
         """
 
-        print(f"\nExtracting PDF: {pdf_path.name}")
+        logger.debug("Extracting PDF: %s", pdf_path.name)
 
         # Step 1: Validate PDF
-        is_valid, validation_msg = self._validate_pdf(pdf_path)
-        print(f"  Validation: {validation_msg}")
+        is_valid, validation_msg = self.validate(pdf_path)
+        logger.debug("Validation: %s", validation_msg)
 
         if not is_valid:
             # Try to repair if corrupted
             repaired_path, repair_success = self._try_repair_pdf(pdf_path)
 
             if repair_success:
-                print(f"  Using repaired PDF for extraction")
+                logger.debug("Using repaired PDF for extraction")
                 pdf_path = repaired_path
             else:
                 return f"Error: {validation_msg}. PDF repair also failed."
 
-        # Step 2: Try pdftotext (command-line tool - most robust)
-        pdftotext_text, pdftotext_success = self._extract_with_pdftotext(pdf_path)
+        # Map the file once; the in-process extractors all read this buffer
+        data = _map_file(str(pdf_path))
+        try:
+            return self._extract_from_buffer(pdf_path, data)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def _extract_from_buffer(self, pdf_path: Path, data: Any) -> str:
+        """Steps 2-6 of extract_text, sharing one mapped copy of the PDF."""
+
+        # PyMuPDF parses the PDF once: the same document gives the page count
+        # and the step 2 text. The view is released after the document is
+        # closed and before the caller closes the mapping.
+        with memoryview(data) as view:
+            try:
+                doc = pymupdf.open(stream=view, filetype="pdf")
+            except Exception as e:
+                logger.debug("PyMuPDF could not open the PDF: %s", e)
+                doc = None
+
+            try:
+                # How much text counts as a good extraction depends on the
+                # page count: a short PDF is done as soon as any text comes
+                # out, instead of falling through every extractor for missing
+                # a fixed 500 chars
+                if doc is None:
+                    min_chars = 500
+                elif doc.page_count <= 2:
+                    min_chars = 0
+                else:
+                    min_chars = max(100, min(doc.page_count, 30) * 50)
+
+                # Step 2: Try PyMuPDF (in-process C engine - fastest)
+                pymupdf_text, pymupdf_success = self._extract_pdf_with_pymupdf(
+                    doc, min_chars=min_chars
+                )
+            finally:
+                if doc is not None:
+                    doc.close()
+
+        if pymupdf_success:
+            logger.debug("Using PyMuPDF extraction (%d chars)", len(pymupdf_text))
+            return pymupdf_text
+
+        # Step 3: Try pdftotext (command-line tool - most robust)
+        pdftotext_text, pdftotext_success = self._extract_with_pdftotext(
+            pdf_path, min_chars=min_chars
+        )
         if pdftotext_success:
-            print(f"Using pdftotext extraction ({len(pdftotext_text)} chars)")
+            logger.debug("Using pdftotext extraction (%d chars)", len(pdftotext_text))
             return pdftotext_text
 
-        # Step 3: Try pypdf
-        pypdf_text, pypdf_success = self._extract_pdf_with_pypdf(pdf_path)
+        # Step 4: Try pypdf
+        pypdf_text, pypdf_success = self._extract_pdf_with_pypdf(
+            pdf_path, data, min_chars=min_chars
+        )
         if pypdf_success:
-            print(f"Using pypdf extraction ({len(pypdf_text)} chars)")
+            logger.debug("Using pypdf extraction (%d chars)", len(pypdf_text))
             return pypdf_text
 
-        # Step 4: Try pdfplumber
+        # Step 5: Try pdfplumber
         pdfplumber_text, pdfplumber_success = self._extract_pdf_with_pdfplumber(
-            pdf_path
+            pdf_path, data, min_chars=min_chars
         )
         if pdfplumber_success:
-            print(f"Using pdfplumber extraction ({len(pdfplumber_text)} chars)")
+            logger.debug("Using pdfplumber extraction (%d chars)", len(pdfplumber_text))
             return pdfplumber_text
 
-        # Step 5: All methods failed - return best attempt
+        # Step 6: All methods failed - return best attempt
         all_results = [
+            (pymupdf_text, "PyMuPDF"),
             (pdftotext_text, "pdftotext"),
             (pypdf_text, "pypdf"),
             (pdfplumber_text, "pdfplumber"),
@@ -337,14 +836,17 @@ class VoIPDocsServer(MCPServer):
         best_text, best_method = all_results[0]
 
         if len(best_text) > 0:
-            print(
-                f"All methods struggled, using best result from {best_method} ({len(best_text)} chars)"
+            logger.debug(
+                "All methods struggled, using best result from %s (%d chars)",
+                best_method,
+                len(best_text),
             )
             return best_text
         else:
             error_msg = f"""Error: Could not extract text from PDF using any method.
 
                     Tried:
+                    - PyMuPDF library: Failed
                     - pdftotext (command-line): {"Not installed" if not pdftotext_success else "Failed"}
                     - pypdf library: Failed
                     - pdfplumber library: Failed
@@ -357,200 +859,521 @@ class VoIPDocsServer(MCPServer):
                     5. Try re-downloading the PDF if it's corrupted
             """
 
-            print(f"{error_msg}")
+            logger.warning(
+                "Could not extract text from %s with any method", pdf_path.name
+            )
             return error_msg
 
-    def get_tools(self) -> List[Dict[str, Any]]:
-        return [
-            {
-                "name": "search_voip_docs",
-                "description": "Search through VoIP documentation for specific topics. Returns relevant excerpts from SIP RFCs, FreeSWITCH docs, etc. Supports both text files and PDF documents.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "Search query (e.g., 'SIP INVITE method', 'FreeSWITCH dialplan', 'call routing')",
+    def _extract_pages(
+        self,
+        worker: Callable[[str, int, int], List[str]],
+        inline: Callable[[int, int], List[str]],
+        pdf_path: Path,
+        pages_to_extract: int,
+    ) -> List[str]:
+        """
+        Run a page worker over the first pages_to_extract pages.
+        Short PDFs (and every PDF, without a pool) are extracted in this
+        process by inline, which reuses the caller's already parsed document.
+        Longer ones are split into one contiguous range per worker process,
+        so each process opens the PDF once; results come back in page order.
+        """
+        chunks = min(_EXTRACT_WORKERS, pages_to_extract)
+        if (
+            self._extract_pool is None
+            or chunks <= 1
+            or pages_to_extract <= _POOL_MIN_PAGES
+        ):
+            return inline(0, pages_to_extract)
+
+        bounds = [pages_to_extract * k // chunks for k in range(chunks + 1)]
+        futures = [
+            self._extract_pool.submit(worker, str(pdf_path), first, last)
+            for first, last in zip(bounds, bounds[1:])
+        ]
+        return [page for future in futures for page in future.result()]
+
+
+def _extract_pdf_file(
+    pdf_path: str, pdftotext: Optional[str], gs: Optional[str]
+) -> str:
+    """Text of a whole PDF (runs in a worker process, pages included)."""
+    return _PdfExtractor(pdftotext, gs).extract_text(Path(pdf_path))
+
+
+class VoIPDocsServer(MCPServer):
+    """MCP server for VoIP documentation with robust PDF extraction"""
+
+    deterministic_tools = frozenset({"search_voip_docs", "get_sip_message_example"})
+
+    def __init__(self, docs_dir: str):
+        super().__init__(
+            name="voip-docs",
+            description="Access to VoIP and SIP protocol documentation",
+        )
+        self.docs_dir = Path(docs_dir)
+        logger.info("VoIP Docs Directory: %s", self.docs_dir)
+
+        # (docs_dir mtime, resources) from the last get_resources() call
+        self._resources_cache: Optional[Tuple[Any, List[Dict[str, Any]]]] = None
+        # (docs_dir mtime, (text docs, PDFs)) from the last directory scan
+        self._dir_cache: Optional[Tuple[Any, Tuple[list, list]]] = None
+
+        self._dispatch = {
+            "search_voip_docs": self._search_docs_tool,
+            "get_sip_message_example": self._get_sip_example_tool,
+            "list_available_docs": self._list_docs_tool,
+        }
+
+        # Copies of the text docs, extracted PDF text and the search index are
+        # kept under .cache
+        self._cache_dir = self.docs_dir / ".cache"
+        self._index_path = self._cache_dir / "index.json"
+
+        # Search index over all docs, replaced as a whole when docs change
+        self._index = _DocIndex(None, {}, {}, {})
+        # (manifest, future) of the latest index build started
+        self._pending_index: Optional[Tuple[Dict[str, Tuple[int, int]], Future]] = None
+
+        # External tools are looked up once rather than per PDF
+        self._pdftotext = shutil.which("pdftotext")
+        self._gs = shutil.which("gs")
+
+        # Worker processes start on first use, not here
+        self._extract_pool = ProcessPoolExecutor(max_workers=_EXTRACT_WORKERS)
+        self._extractor = _PdfExtractor(self._pdftotext, self._gs, self._extract_pool)
+        # PyMuPDF must not be used from several threads at once, so everything
+        # that opens PDFs in this process (index builds, read_resource) runs on
+        # this one thread, off the event loop
+        self._pdf_thread = ThreadPoolExecutor(max_workers=1)
+
+        # Start indexing right away, without holding up startup
+        self._index_build(self._docs_manifest())
+
+    async def aclose(self) -> None:
+        self._pdf_thread.shutdown(wait=False, cancel_futures=True)
+        self._extract_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _list_files(self) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """
+        (text docs, PDFs) in the docs directory, as (name, path) pairs.
+        One os.scandir pass, reused until the directory mtime changes. Only
+        names are cached (file stats are always read fresh, since editing a
+        file leaves the directory mtime alone); hidden files are skipped like
+        glob does.
+        """
+        version = self.get_resources_version()
+        if self._dir_cache is not None and self._dir_cache[0] == version:
+            return self._dir_cache[1]
+
+        txt_files, pdf_files = [], []
+        try:
+            with os.scandir(self.docs_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or not entry.is_file():
+                        continue
+                    if entry.name.endswith(".txt"):
+                        txt_files.append((entry.name, entry.path))
+                    elif entry.name.endswith(".pdf"):
+                        pdf_files.append((entry.name, entry.path))
+        except FileNotFoundError:
+            pass
+
+        self._dir_cache = (version, (txt_files, pdf_files))
+        return txt_files, pdf_files
+
+    def _docs_manifest(self) -> Dict[str, Tuple[int, int]]:
+        """Map each doc to its (size, mtime), used to detect index staleness."""
+        manifest = {}
+        txt_files, pdf_files = self._list_files()
+        for name, path in txt_files + pdf_files:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # Removed since the listing was taken
+            manifest[name] = (st.st_size, st.st_mtime_ns)
+        return manifest
+
+    def _source_path(self, name: str) -> str:
+        """
+        Cache file holding the text of a doc's current version: a copy of a
+        text doc, or a PDF's extraction.
+        """
+        return str(self._cache_path(self.docs_dir / name))
+
+    def _index_source(self, name: str) -> Optional[str]:
+        """
+        File the index reads a doc's lines from.
+        Text docs are copied into the cache first, unless already there; PDFs
+        have been extracted into it by _extract_missing_pdfs. Returns None if
+        there is no text to index.
+        """
+        source = self._source_path(name)
+        if os.path.exists(source):
+            return source
+
+        if not name.endswith(".pdf"):
+            # Written under a temporary name and renamed into place, so a
+            # mapped copy is never truncated
+            self._cache_dir.mkdir(exist_ok=True)
+            tmp_path = Path(source).with_suffix(".tmp")
+            shutil.copyfile(self.docs_dir / name, tmp_path)
+            os.replace(tmp_path, source)
+            return source
+
+        return None  # Extraction failed
+
+    def _extract_missing_pdfs(self, manifest: Dict[str, Tuple[int, int]]) -> None:
+        """
+        Extract every PDF in manifest that is not in the cache yet (runs on
+        the PDF thread). Each PDF is extracted whole in a worker process, so
+        a cold build runs them side by side instead of one after another;
+        being processes, the workers are free to use PyMuPDF at once.
+        """
+        pending = []
+        for name in sorted(manifest):
+            if not name.endswith(".pdf"):
+                continue
+            pdf_path = self.docs_dir / name
+            try:
+                cache_path = self._cache_path(pdf_path)
+            except OSError:
+                continue  # Removed since the manifest was taken
+            if not cache_path.exists():
+                future = self._extract_pool.submit(
+                    _extract_pdf_file, str(pdf_path), self._pdftotext, self._gs
+                )
+                pending.append((name, cache_path, future))
+
+        for name, cache_path, future in pending:
+            try:
+                text = future.result()
+            except Exception as e:
+                logger.warning("Error extracting %s: %s", name, e)
+                continue
+
+            if text.startswith("Error:"):
+                logger.warning("Could not extract text from %s", name)
+            else:
+                self._write_cache(cache_path, text)
+
+    def _index_build(self, manifest: Dict[str, Tuple[int, int]]) -> Future:
+        """
+        Future of the index for manifest. The build is submitted to the PDF
+        thread once; later callers wait on the same future, and a failed
+        build is retried.
+        """
+        pending = self._pending_index
+        future = pending[1] if pending is not None and pending[0] == manifest else None
+        if future is None or (
+            future.done() and (future.cancelled() or future.exception() is not None)
+        ):
+            future = self._pdf_thread.submit(self._build_index, manifest)
+            self._pending_index = (manifest, future)
+        return future
+
+    async def _current_index(self) -> "_DocIndex":
+        """
+        Index matching the docs on disk.
+        A stale index is rebuilt on the PDF thread while the event loop keeps
+        serving, then swapped in as a whole.
+        """
+        manifest = self._docs_manifest()
+        index = self._index
+        if index.manifest != manifest:
+            index = await asyncio.wrap_future(self._index_build(manifest))
+            self._index = index
+        return index
+
+    def _build_index(self, manifest: Dict[str, Tuple[int, int]]) -> "_DocIndex":
+        """
+        Index for the docs in manifest (runs on the PDF thread).
+        Loads the saved index if it is current, otherwise rebuilds it.
+        """
+        try:
+            cached = orjson.loads(self._index_path.read_bytes())
+            saved_manifest = {name: tuple(v) for name, v in cached["manifest"].items()}
+            if cached["format"] == _INDEX_FORMAT and saved_manifest == manifest:
+                index = self._load_index(manifest, cached)
+                logger.info("Loaded search index (%d tokens)", len(index.vocab))
+                self._prune_cache(manifest)
+                return index
+        except Exception:
+            pass  # Missing, stale or malformed index, rebuild below
+
+        postings = defaultdict(list)
+        sources = {}
+        line_starts_by_file = {}
+
+        self._extract_missing_pdfs(manifest)
+        for name in sorted(manifest):
+            try:
+                source = self._index_source(name)
+                if source is None:
+                    continue
+                data = _map_file(source)
+            except Exception as e:
+                logger.warning("Error indexing %s: %s", name, e)
+                continue
+
+            sources[name] = source
+
+            # Byte offset of each line, plus a sentinel one past the end
+            line_starts = array("q", [0])
+            line_starts.extend(m.end() for m in _NEWLINE_RE.finditer(data))
+            line_starts.append(len(data) + 1)
+            line_starts_by_file[name] = line_starts
+
+            for line_no in range(len(line_starts) - 1):
+                line = data[line_starts[line_no] : line_starts[line_no + 1] - 1]
+                for token in set(
+                    _TOKEN_RE.findall(line.decode(errors="replace").lower())
+                ):
+                    postings[token].append((name, line_no))
+
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+        postings = dict(postings)
+        index = _DocIndex(manifest, sources, postings, line_starts_by_file)
+        logger.info(
+            "Built search index (%d tokens, %d files)", len(index.vocab), len(manifest)
+        )
+
+        # Saved as plain JSON: postings become flat [file number, line, ...]
+        # lists, numbered in line_starts order
+        file_ids = {name: i for i, name in enumerate(line_starts_by_file)}
+        try:
+            self._index_path.parent.mkdir(exist_ok=True)
+            tmp_path = self._index_path.with_suffix(".tmp")
+            tmp_path.write_bytes(
+                orjson.dumps(
+                    {
+                        "format": _INDEX_FORMAT,
+                        "manifest": manifest,
+                        "line_starts": {
+                            name: offsets.tolist()
+                            for name, offsets in line_starts_by_file.items()
                         },
-                        "max_results": {
-                            "type": "integer",
-                            "description": "Maximum number of results to return",
-                            "default": 3,
+                        "postings": {
+                            token: [
+                                n
+                                for name, line_no in refs
+                                for n in (file_ids[name], line_no)
+                            ]
+                            for token, refs in postings.items()
                         },
-                    },
-                    "required": ["query"],
-                },
-            },
-            {
-                "name": "get_sip_message_example",
-                "description": "Get example SIP messages for different scenarios (INVITE, REGISTER, BYE, etc.)",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "message_type": {
-                            "type": "string",
-                            "enum": [
-                                "INVITE",
-                                "REGISTER",
-                                "BYE",
-                                "CANCEL",
-                                "ACK",
-                                "OPTIONS",
-                            ],
-                            "description": "Type of SIP message",
-                        }
-                    },
-                    "required": ["message_type"],
-                },
-            },
-            {
-                "name": "list_available_docs",
-                "description": "List all available VoIP documentation files in the system",
-                "input_schema": {"type": "object", "properties": {}, "required": []},
-            },
-        ]
+                    }
+                )
+            )
+            os.replace(tmp_path, self._index_path)
+        except OSError as e:
+            logger.warning("Could not save search index: %s", e)
+
+        self._prune_cache(manifest)
+        return index
+
+    def _prune_cache(self, manifest: Dict[str, Tuple[int, int]]) -> None:
+        """
+        Delete cached texts no doc in manifest refers to (runs on the PDF
+        thread). Each doc edit gets a new cache key, so without this every
+        old version's text would stay in .cache.
+        """
+        live = set()
+        for name in manifest:
+            try:
+                live.add(self._source_path(name))
+            except OSError:
+                continue  # Removed since the manifest was taken
+
+        try:
+            entries = list(os.scandir(self._cache_dir))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.endswith(".txt") and entry.path not in live:
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    logger.debug("Could not remove %s: %s", entry.path, e)
+
+    def _load_index(
+        self, manifest: Dict[str, Tuple[int, int]], cached: Dict[str, Any]
+    ) -> "_DocIndex":
+        """
+        Index from a saved index file. The file lives in the docs directory,
+        which others may be able to write to, so only plain lists and numbers
+        are taken from it: paths are derived from the doc names here, and
+        every name must be a doc in manifest.
+        """
+        files = list(cached["line_starts"])
+        if not manifest.keys() >= set(files):
+            raise ValueError("Saved index lists unknown docs")
+
+        sources = {name: self._source_path(name) for name in files}
+        if not all(map(os.path.exists, sources.values())):
+            raise FileNotFoundError("Saved index refers to missing text")
+
+        line_starts = {
+            name: array("q", offsets) for name, offsets in cached["line_starts"].items()
+        }
+        postings = {
+            token: [(files[f], line_no) for f, line_no in zip(refs[::2], refs[1::2])]
+            for token, refs in cached["postings"].items()
+        }
+        return _DocIndex(manifest, sources, postings, line_starts)
+
+    def _cache_path(self, doc_path: Path) -> Path:
+        """Cache file for the current version of a doc (name, size and mtime)."""
+        st = doc_path.stat()
+        key = hashlib.blake2b(
+            f"{doc_path}\0{st.st_size}\0{st.st_mtime_ns}".encode(), digest_size=16
+        ).hexdigest()
+        return self._cache_dir / f"{key}.txt"
+
+    def _cached_extract(self, pdf_path: Path) -> str:
+        """
+        Extract text from a PDF once and reuse it from the on-disk cache.
+        A changed PDF gets a new cache key, so stale text is never served.
+        Failed extractions are not cached and are retried on the next call.
+        """
+        try:
+            cache_path = self._cache_path(pdf_path)
+        except OSError:
+            return self._extractor.extract_text(pdf_path)
+
+        try:
+            return _read_cached_text(str(cache_path))
+        except (OSError, UnicodeDecodeError):
+            pass  # Not extracted yet
+
+        text = self._extractor.extract_text(pdf_path)
+        if not text.startswith("Error:"):
+            self._write_cache(cache_path, text)
+        return text
+
+    def _write_cache(self, cache_path: Path, text: str) -> None:
+        """Save extracted text under a temporary name, then rename it into place."""
+        try:
+            self._cache_dir.mkdir(exist_ok=True)
+            tmp_path = cache_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8", errors="replace") as f:
+                f.write(text)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning("Could not cache extracted text: %s", e)
+
+    def get_tools(self) -> List[Dict[str, Any]]:
+        return _VOIP_TOOLS
+
+    def get_resources_version(self) -> Any:
+        # Adding, removing or renaming a doc updates the directory mtime
+        try:
+            return self.docs_dir.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def get_content_version(self) -> Any:
+        # Editing a doc in place leaves the directory mtime alone, but not
+        # the doc's size and mtime
+        return tuple(sorted(self._docs_manifest().items()))
 
     def get_resources(self) -> List[Dict[str, Any]]:
         """List available documentation files (TXT and PDF)"""
+        version = self.get_resources_version()
+        if self._resources_cache is not None and self._resources_cache[0] == version:
+            return self._resources_cache[1]
+
         resources = []
 
         if not self.docs_dir.exists():
-            print(f"Documentation directory does not exist: {self.docs_dir}")
+            logger.warning("Documentation directory does not exist: %s", self.docs_dir)
             return resources
 
-        for doc_file in self.docs_dir.glob("*.txt"):
+        txt_files, pdf_files = self._list_files()
+
+        for name, path in txt_files:
+            stem = name[:-4]
             resources.append(
                 {
-                    "uri": f"file://{doc_file}",
-                    "name": doc_file.stem,
-                    "description": f"VoIP documentation: {doc_file.stem}",
+                    "uri": f"file://{path}",
+                    "name": stem,
+                    "description": f"VoIP documentation: {stem}",
                     "mimeType": "text/plain",
                 }
             )
 
-        for doc_file in self.docs_dir.glob("*.pdf"):
+        for name, path in pdf_files:
+            stem = name[:-4]
             resources.append(
                 {
-                    "uri": f"file://{doc_file}",
-                    "name": doc_file.stem,
-                    "description": f"VoIP PDF: {doc_file.stem}",
+                    "uri": f"file://{path}",
+                    "name": stem,
+                    "description": f"VoIP PDF: {stem}",
                     "mimeType": "application/pdf",
                 }
             )
 
-        print(f"Found {len(resources)} documentation files")
+        logger.debug("Found %d documentation files", len(resources))
+        self._resources_cache = (version, resources)
         return resources
 
-    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
-        """Execute tool calls"""
-
-        if tool_name == "search_voip_docs":
-            return await self._search_docs(
-                arguments["query"], arguments.get("max_results", 3)
-            )
-
-        elif tool_name == "get_sip_message_example":
-            return self._get_sip_example(arguments["message_type"])
+    async def _search_docs_tool(self, arguments: Dict[str, Any]) -> Any:
+        return await self._search_docs(
+            arguments["query"], arguments.get("max_results", 3)
+        )
 
-        elif tool_name == "list_available_docs":
-            return self._list_docs()
+    async def _get_sip_example_tool(self, arguments: Dict[str, Any]) -> Any:
+        return self._get_sip_example(arguments["message_type"])
 
-        else:
-            return {"error": f"Unknown tool: {tool_name}"}
+    async def _list_docs_tool(self, arguments: Dict[str, Any]) -> Any:
+        return self._list_docs()
 
     async def _search_docs(self, query: str, max_results: int) -> Dict[str, Any]:
         """Search through documentation files (TXT and PDF)"""
 
-        print(f"\nSearching for: '{query}'")
+        logger.debug("Searching for: %r", query)
 
         results = []
+        total_found = 0
         query_lower = query.lower()
 
+        # max_results caps the number of excerpts across all files
+        remaining = max_results
+
         if not self.docs_dir.exists():
             return {
                 "results": [],
                 "message": f"Documentation directory not found: {self.docs_dir}",
             }
 
-        # Search through text files
-        for doc_file in self.docs_dir.glob("*.txt"):
-            try:
-                content = doc_file.read_text()
-
-                if query_lower in content.lower():
-                    lines = content.split("\n")
-                    matches = []
-
-                    for i, line in enumerate(lines):
-                        if query_lower in line.lower():
-                            start = max(0, i - 2)
-                            end = min(len(lines), i + 3)
-                            context = "\n".join(lines[start:end])
-                            matches.append(context)
-
-                            if len(matches) >= max_results:
-                                break
-
-                    if matches:
-                        results.append(
-                            {
-                                "file": doc_file.name,
-                                "type": "text",
-                                "matches": matches[:max_results],
-                            }
-                        )
-                        print(f"  ✓ Found {len(matches)} matches in {doc_file.name}")
-
-            except Exception as e:
-                print(f"  ✗ Error reading {doc_file.name}: {e}")
-                continue
-
-        # Search through PDF files
-        for doc_file in self.docs_dir.glob("*.pdf"):
-            try:
-                print(f"  Searching PDF: {doc_file.name}")
-
-                # Extract text from PDF
-                content = self._extract_pdf_text(doc_file)
-
-                if content.startswith("Error:"):
-                    print(f"  ✗ Could not extract text from {doc_file.name}")
-                    continue
-
-                if query_lower in content.lower():
-                    lines = content.split("\n")
-                    matches = []
-
-                    for i, line in enumerate(lines):
-                        if query_lower in line.lower():
-                            start = max(0, i - 2)
-                            end = min(len(lines), i + 3)
-                            context = "\n".join(lines[start:end])
-                            matches.append(context)
-
-                            if len(matches) >= max_results:
-                                break
-
-                    if matches:
-                        results.append(
-                            {
-                                "file": doc_file.name,
-                                "type": "pdf",
-                                "matches": matches[:max_results],
-                            }
-                        )
-                        print(f" Found {len(matches)} matches in {doc_file.name}")
-
-            except Exception as e:
-                print(f"Error searching PDF {doc_file.name}: {e}")
-                continue
+        # Search through text files and extracted PDF text using the index
+        index = await self._current_index()
+
+        for file_name, line_numbers in index.search(query_lower):
+            total_found += 1
+            logger.debug("Found %d matches in %s", len(line_numbers), file_name)
+
+            if remaining > 0:
+                matches = [
+                    index.doc_lines(file_name, i - 2, i + 3)
+                    for i in line_numbers[:remaining]
+                ]
+                remaining -= len(matches)
+                results.append(
+                    {
+                        "file": file_name,
+                        "type": "pdf" if file_name.endswith(".pdf") else "text",
+                        "matches": matches,
+                    }
+                )
 
-        print(f"Search complete: {len(results)} files with matches\n")
+        logger.debug("Search complete: %d files with matches", len(results))
 
         return {
-            "results": results[:max_results],
+            "results": results,
             "query": query,
-            "total_found": len(results),
+            "total_found": total_found,
         }
 
     def _list_docs(self) -> Dict[str, Any]:
@@ -564,24 +1387,26 @@ class VoIPDocsServer(MCPServer):
 
         docs = []
 
-        for doc_file in self.docs_dir.glob("*.txt"):
+        txt_files, pdf_files = self._list_files()
+
+        for name, path in txt_files:
             docs.append(
                 {
-                    "name": doc_file.name,
+                    "name": name,
                     "type": "text",
-                    "size": f"{doc_file.stat().st_size / 1024:.1f} KB",
+                    "size": f"{os.stat(path).st_size / 1024:.1f} KB",
                 }
             )
 
-        for doc_file in self.docs_dir.glob("*.pdf"):
+        for name, path in pdf_files:
             # Validate PDF
-            is_valid, msg = self._validate_pdf(doc_file)
+            is_valid, msg = self._extractor.validate(Path(path))
 
             docs.append(
                 {
-                    "name": doc_file.name,
+                    "name": name,
                     "type": "pdf",
-                    "size": f"{doc_file.stat().st_size / 1024:.1f} KB",
+                    "size": f"{os.stat(path).st_size / 1024:.1f} KB",
                     "status": "valid" if is_valid else f"invalid ({msg})",
                 }
             )
@@ -594,67 +1419,9 @@ class VoIPDocsServer(MCPServer):
 
     def _get_sip_example(self, message_type: str) -> str:
         """Return example SIP messages"""
-
-        examples = {
-            "INVITE": """INVITE sip:bob@biloxi.com SIP/2.0
-            Via: SIP/2.0/UDP pc33.atlanta.com;branch=z9hG4bKnashds8
-            Max-Forwards: 70
-            To: Bob <sip:bob@biloxi.com>
-            From: Alice <sip:alice@atlanta.com>;tag=1928301774
-            Call-ID: a84b4c76e66710@pc33.atlanta.com
-            CSeq: 314159 INVITE
-            Contact: <sip:alice@pc33.atlanta.com>
-            Content-Type: application/sdp
-            Content-Length: 142
-
-            (SDP content here)""",
-            "REGISTER": """REGISTER sip:registrar.biloxi.com SIP/2.0
-            Via: SIP/2.0/UDP bobspc.biloxi.com:5060;branch=z9hG4bKnashds7
-            Max-Forwards: 70
-            To: Bob <sip:bob@biloxi.com>
-            From: Bob <sip:bob@biloxi.com>;tag=456248
-            Call-ID: 843817637684230@998sdasdh09
-            CSeq: 1826 REGISTER
-            Contact: <sip:bob@192.0.2.4>
-            Expires: 7200
-            Content-Length: 0""",
-            "BYE": """BYE sip:alice@pc33.atlanta.com SIP/2.0
-            Via: SIP/2.0/UDP 192.0.2.4;branch=z9hG4bKnashds10
-            Max-Forwards: 70
-            From: Bob <sip:bob@biloxi.com>;tag=a6c85cf
-            To: Alice <sip:alice@atlanta.com>;tag=1928301774
-            Call-ID: a84b4c76e66710
-            CSeq: 231 BYE
-            Content-Length: 0""",
-            "ACK": """ACK sip:bob@192.0.2.4 SIP/2.0
-            Via: SIP/2.0/UDP pc33.atlanta.com;branch=z9hG4bKnashds9
-            Max-Forwards: 70
-            To: Bob <sip:bob@biloxi.com>;tag=a6c85cf
-            From: Alice <sip:alice@atlanta.com>;tag=1928301774
-            Call-ID: a84b4c76e66710@pc33.atlanta.com
-            CSeq: 314159 ACK
-            Content-Length: 0""",
-            "CANCEL": """CANCEL sip:bob@biloxi.com SIP/2.0
-            Via: SIP/2.0/UDP pc33.atlanta.com;branch=z9hG4bKnashds8
-            Max-Forwards: 70
-            To: Bob <sip:bob@biloxi.com>
-            From: Alice <sip:alice@atlanta.com>;tag=1928301774
-            Call-ID: a84b4c76e66710@pc33.atlanta.com
-            CSeq: 314159 CANCEL
-            Content-Length: 0""",
-            "OPTIONS": """OPTIONS sip:bob@biloxi.com SIP/2.0
-            Via: SIP/2.0/UDP pc33.atlanta.com;branch=z9hG4bKnashds11
-            Max-Forwards: 70
-            To: <sip:bob@biloxi.com>
-            From: Alice <sip:alice@atlanta.com>;tag=1928301774
-            Call-ID: a84b4c76e66710
-            CSeq: 63104 OPTIONS
-            Contact: <sip:alice@pc33.atlanta.com>
-            Accept: application/sdp
-            Content-Length: 0""",
-        }
-
-        return examples.get(message_type, f"No example available for {message_type}")
+        return _SIP_EXAMPLES.get(
+            message_type, f"No example available for {message_type}"
+        )
 
     async def read_resource(self, uri: str) -> str:
         """Read a documentation file (TXT or PDF)"""
@@ -663,10 +1430,11 @@ class VoIPDocsServer(MCPServer):
 
         try:
             if path_obj.suffix == ".pdf":
-                return self._extract_pdf_text(path_obj)
+                return await asyncio.wrap_future(
+                    self._pdf_thread.submit(self._cached_extract, path_obj)
+                )
             else:
-                with open(path, "r") as f:
-                    return f.read()
+                return _read_doc_text(path, os.stat(path).st_mtime_ns)
         except Exception as e:
             return f"Error reading resource: {str(e)}"
 
@@ -675,56 +1443,70 @@ class VoIPDocsServer(MCPServer):
 class WeatherServer(MCPServer):
     """MCP server for weather data"""
 
+    # get_weather is left out of deterministic_tools: conditions are already
+    # cached here for 10 minutes, and the client's cache on top would let a
+    # result get up to twice as old
+
     def __init__(self):
         super().__init__(name="weather", description="Get current weather information")
 
+        self._dispatch = {"get_weather": self._get_weather_tool}
+
+        # Pooled HTTP client, created lazily on the event loop that uses it
+        self._client = None
+        self._client_loop = None
+
+        # Current conditions per rounded coordinate, valid for 10 minutes
+        self._weather_cache = TTLCache(maxsize=256, ttl=600)
+        self._weather_cache_lock = threading.Lock()
+
     def get_tools(self) -> List[Dict[str, Any]]:
-        return [
-            {
-                "name": "get_weather",
-                "description": "Get current weather for a location using Open-Meteo API",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "latitude": {
-                            "type": "number",
-                            "description": "Latitude coordinate",
-                        },
-                        "longitude": {
-                            "type": "number",
-                            "description": "Longitude coordinate",
-                        },
-                        "location_name": {
-                            "type": "string",
-                            "description": "Human-readable location name (optional)",
-                        },
-                    },
-                    "required": ["latitude", "longitude"],
-                },
-            }
-        ]
+        return _WEATHER_TOOLS
 
     def get_resources(self) -> List[Dict[str, Any]]:
         return []
 
-    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
-        if tool_name == "get_weather":
-            return await self._get_weather(
-                arguments["latitude"],
-                arguments["longitude"],
-                arguments.get("location_name", "Unknown"),
+    async def _get_weather_tool(self, arguments: Dict[str, Any]) -> Any:
+        return await self._get_weather(
+            arguments["latitude"],
+            arguments["longitude"],
+            arguments.get("location_name", "Unknown"),
+        )
+
+    def _get_client(self):
+        """
+        Shared HTTP client so calls reuse warm connections to Open-Meteo.
+        Connections are tied to an event loop, so a new loop gets a new client.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url="https://api.open-meteo.com",
+                http2=True,
+                timeout=10,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
             )
-        return {"error": f"Unknown tool: {tool_name}"}
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
 
     async def _get_weather(
         self, lat: float, lon: float, location: str
     ) -> Dict[str, Any]:
-        import httpx
+        cache_key = (round(lat, 2), round(lon, 2))
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "https://api.open-meteo.com/v1/forecast",
+            with self._weather_cache_lock:
+                current = self._weather_cache.get(cache_key)
+
+            if current is None:
+                response = await self._get_client().get(
+                    "/v1/forecast",
                     params={
                         "latitude": lat,
                         "longitude": lon,
@@ -733,19 +1515,20 @@ class WeatherServer(MCPServer):
                     },
                 )
 
-                if response.status_code == 200:
-                    data = response.json()
-                    current = data.get("current", {})
-
-                    return {
-                        "location": location,
-                        "temperature": f"{current.get('temperature_2m')}°C",
-                        "humidity": f"{current.get('relative_humidity_2m')}%",
-                        "wind_speed": f"{current.get('wind_speed_10m')} km/h",
-                        "coordinates": {"lat": lat, "lon": lon},
-                    }
-                else:
+                if response.status_code != 200:
                     return {"error": f"API error: {response.status_code}"}
 
+                current = response.json().get("current", {})
+                with self._weather_cache_lock:
+                    self._weather_cache[cache_key] = current
+
+            return {
+                "location": location,
+                "temperature": f"{current.get('temperature_2m')}°C",
+                "humidity": f"{current.get('relative_humidity_2m')}%",
+                "wind_speed": f"{current.get('wind_speed_10m')} km/h",
+                "coordinates": {"lat": lat, "lon": lon},
+            }
+
         except Exception as e:
             return {"error": f"Failed to fetch weather: {str(e)}"}
@@ -0,0 +1,26 @@
+# Generated by Django 6.1.2 on 2026-10-14 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcp_chat", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["-updated_at"], name="mcp_chat_co_updated_c45206_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "created_at"],
+                name="mcp_chat_me_convers_78a470_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-14 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcp_chat", "0002_add_ordering_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "-id"], name="mcp_chat_me_convers_220ee8_idx"
+            ),
+        ),
+    ]
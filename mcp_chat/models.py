@@ -10,6 +10,7 @@ class Conversation(models.Model):
 
     class Meta:
         ordering = ["-updated_at"]
+        indexes = [models.Index(fields=["-updated_at"])]
 
     def __str__(self):
         return f"{self.title} ({self.created_at.strftime('%Y-%m-%d')})"
@@ -30,6 +31,12 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        # Serve a conversation's messages in order, and its latest ones for
+        # the history window, with one index range scan each
+        indexes = [
+            models.Index(fields=["conversation", "created_at"]),
+            models.Index(fields=["conversation", "-id"]),
+        ]
 
     def __str__(self):
         return f"{self.role}: {self.content[:50]}"
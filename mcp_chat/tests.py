@@ -1,3 +1,322 @@
-from django.test import TestCase
+import re
+import shutil
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+import orjson
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .mcp_servers import VoIPDocsServer
+from .models import Conversation, Message
+
+
+DOCS = {
+    "rfc3261.txt": (
+        "SIP INVITE requests establish a session.\n"
+        "The UAC sends an INVITE; the UAS replies with 180 Ringing.\n"
+        "Re-INVITEs modify an existing dialog.\n"
+        "\n"
+        "Via: SIP/2.0/UDP pc33.atlanta.com;branch=z9hG4bK776asdhds\n"
+        "CSeq: 314159 INVITE\n"
+        "Contact: <sip:alice@pc33.atlanta.com>\n"
+    ),
+    "freeswitch.txt": (
+        "FreeSWITCH dialplan routes each call.\n"
+        "Extensions in the dialplan match on destination_number.\n"
+        "The café demo plays hold music -- see mod_local_stream.\n"
+        "invites, INVITE and Invitation all differ.\n"
+    ),
+    "notes.txt": "\n".join(f"line {i}: call routing note {i}" for i in range(40)),
+}
+
+
+class VoIPDocsSearchTests(SimpleTestCase):
+    """The inverted index must find exactly what a plain substring scan finds."""
+
+    def setUp(self):
+        self.docs_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.docs_dir)
+        for name, text in DOCS.items():
+            (self.docs_dir / name).write_text(text)
+
+    async def _server(self):
+        server = VoIPDocsServer(str(self.docs_dir))
+        self.addCleanup(async_to_sync(server.aclose))
+        return server
+
+    def _scan(self, query):
+        """(file, line number) of every line containing query, ignoring case."""
+        needle = query.lower()
+        return {
+            (name, line_no)
+            for name, text in DOCS.items()
+            for line_no, line in enumerate(text.split("\n"))
+            if needle in line.lower()
+        }
+
+    async def _search(self, server, query):
+        index = await server._current_index()
+        return {
+            (name, line_no)
+            for name, line_numbers in index.search(query.lower())
+            for line_no in line_numbers
+        }
+
+    async def test_matches_substring_scan(self):
+        server = await self._server()
+        for query in [
+            "invite",
+            "INVITE",
+            "nvit",
+            "invite requests",
+            "sip invite requests establish",
+            "the uac sends an invite; the",
+            "re-invites",
+            "dialplan",
+            "plan route",
+            "café",
+            "call routing note 3",
+            "sip:alice@pc33",
+            "z9hG4bK",
+            "314159 inv",
+            "not in any doc",
+        ]:
+            with self.subTest(query=query):
+                self.assertEqual(await self._search(server, query), self._scan(query))
+
+    async def test_punctuation_only_queries(self):
+        server = await self._server()
+        for query in [";", "--", ": <", "/", "...", " "]:
+            with self.subTest(query=query):
+                self.assertEqual(await self._search(server, query), self._scan(query))
+
+    async def test_max_results_caps_excerpts_across_files(self):
+        server = await self._server()
+        result = await server._search_docs("call", max_results=3)
+
+        self.assertEqual(sum(len(r["matches"]) for r in result["results"]), 3)
+        # Every file with a hit is counted, even past the cap
+        self.assertEqual(result["total_found"], 2)
+
+        result = await server._search_docs("call", max_results=0)
+        self.assertEqual(result["results"], [])
+        self.assertEqual(result["total_found"], 2)
+
+    async def test_saved_index_is_reused(self):
+        server = await self._server()
+        expected = await self._search(server, "invite")
+
+        # A second server loads the saved index instead of rebuilding it
+        index_path = self.docs_dir / ".cache" / "index.json"
+        self.assertTrue(index_path.exists())
+        reloaded = await self._server()
+        self.assertEqual(await self._search(reloaded, "invite"), expected)
+
+    async def test_doc_edits_are_picked_up(self):
+        server = await self._server()
+        self.assertEqual(await self._search(server, "zebra"), set())
+
+        with open(self.docs_dir / "notes.txt", "a") as f:
+            f.write("\nzebra crossing\n")
+
+        self.assertEqual(await self._search(server, "zebra"), {("notes.txt", 40)})
+
+    async def test_truncating_a_doc_does_not_break_a_held_index(self):
+        server = await self._server()
+        index = await server._current_index()
+
+        # The index maps its own copy, so the old text stays readable (mapping
+        # the doc itself would crash the process with SIGBUS here)
+        (self.docs_dir / "notes.txt").write_text("")
+        self.assertEqual(
+            index.doc_lines("notes.txt", 39, 40), "line 39: call routing note 39"
+        )
+        self.assertEqual(await self._search(server, "routing"), set())
+
+    async def test_saved_index_cannot_point_outside_the_docs(self):
+        server = await self._server()
+        await server._current_index()
+
+        # A planted index naming a file outside the docs directory is ignored
+        index_path = self.docs_dir / ".cache" / "index.json"
+        planted = index_path.read_text()
+        planted = re.sub(
+            r'"line_starts":\{"', '"line_starts":{"../../etc/passwd":[0,5],"', planted
+        )
+        index_path.write_text(planted)
+
+        reloaded = await self._server()
+        index = await reloaded._current_index()
+        self.assertEqual(set(index.sources), set(DOCS))
+
+
+class _StubClient:
+    """Stands in for MCPClient: replays events and records what it was sent."""
+
+    def __init__(self):
+        self.events = ()
+        self.histories = []
+        # Messages saved by the time the stream was about to end
+        self.saved_before_done = None
+
+    async def send_message_stream(self, user_message, history):
+        self.histories.append(history)
+        for event in self.events:
+            if isinstance(event, Exception):
+                raise event
+            if event["type"] == "done":
+                self.saved_before_done = await Message.objects.acount()
+            yield event
+
+    def get_clean_tools_for_api(self):
+        return []
+
+
+class SendMessageTests(TestCase):
+    """send_message streams SSE and saves the turn once it is over."""
+
+    def setUp(self):
+        config = apps.get_app_config("mcp_chat")
+        self.addCleanup(setattr, config, "_mcp_client", config._mcp_client)
+        self.stub = config._mcp_client = _StubClient()
+
+        # Opening the chat starts a conversation and stores it in the session
+        async_to_sync(self.async_client.get)("/")
+        self.conversation = Conversation.objects.get()
+
+    async def _send(self, message):
+        """Events of one streamed reply, parsed from the SSE frames."""
+        response = await self.async_client.post("/send/", {"message": message})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join([chunk async for chunk in response.streaming_content])
+
+        frames = body.split(b"\n\n")
+        self.assertEqual(frames.pop(), b"")
+        for frame in frames:
+            self.assertTrue(frame.startswith(b"data: "), frame)
+        return [orjson.loads(frame[len(b"data: ") :]) for frame in frames]
+
+    async def _rows(self):
+        return [
+            (m.role, m.content, m.tool_calls)
+            async for m in self.conversation.messages.order_by("id")
+        ]
+
+    async def _title(self):
+        await self.conversation.arefresh_from_db()
+        return self.conversation.title
+
+    async def test_reply_saves_both_messages_after_done(self):
+        tool_calls = [{"tool": "search_voip_docs", "input": {"query": "INVITE"}}]
+        self.stub.events = (
+            {"type": "text", "text": "Hello"},
+            {"type": "done", "response": "Hello", "tool_calls": tool_calls},
+        )
+
+        events = await self._send("What is an INVITE?")
+
+        self.assertEqual([e["type"] for e in events], ["text", "done"])
+        self.assertEqual(events[1]["assistant_response"], "Hello")
+        # Nothing is written until the reply is complete, then both rows are
+        self.assertEqual(self.stub.saved_before_done, 0)
+        self.assertEqual(
+            await self._rows(),
+            [
+                ("user", "What is an INVITE?", None),
+                ("assistant", "Hello", tool_calls),
+            ],
+        )
+        self.assertEqual(await self._title(), "What is an INVITE?")
+
+    async def test_title_is_set_once(self):
+        self.stub.events = ({"type": "done", "response": "ok", "tool_calls": []},)
+
+        await self._send("first question")
+        await self._send("second question")
+
+        self.assertEqual(await self._title(), "first question")
+        self.assertEqual(len(await self._rows()), 4)
+
+    async def test_error_event_saves_only_the_user_message(self):
+        self.stub.events = (
+            {"type": "text", "text": "Partial"},
+            {"type": "error", "error": "No final answer after 5 tool rounds"},
+        )
+
+        events = await self._send("hello")
+
+        self.assertEqual([e["type"] for e in events], ["text", "error"])
+        self.assertEqual(await self._rows(), [("user", "hello", None)])
+        self.assertEqual(await self._title(), "New Chat")
+
+    async def test_exception_saves_only_the_user_message(self):
+        self.stub.events = ({"type": "text", "text": "Partial"}, RuntimeError("down"))
+
+        events = await self._send("hello")
+
+        self.assertEqual(
+            events[-1], {"type": "error", "error": "Error processing message: down"}
+        )
+        self.assertEqual(await self._rows(), [("user", "hello", None)])
+        self.assertEqual(await self._title(), "New Chat")
+
+    @override_settings(MCP_HISTORY_TURNS=3)
+    async def test_history_window_starts_with_a_user_turn(self):
+        await Message.objects.abulk_create(
+            Message(conversation=self.conversation, role=role, content=content)
+            for role, content in [
+                ("user", "q1"),
+                ("assistant", "a1"),
+                ("user", "q2"),
+                ("assistant", "a2"),
+            ]
+        )
+        self.stub.events = ({"type": "done", "response": "a3", "tool_calls": []},)
+
+        await self._send("q3")
+
+        # The last 3 rows are a1, q2, a2; the leading assistant row is dropped
+        self.assertEqual(
+            self.stub.histories,
+            [
+                [
+                    {"role": "user", "content": "q2"},
+                    {"role": "assistant", "content": "a2"},
+                ]
+            ],
+        )
+
+    @override_settings(MCP_HISTORY_MAX_CHARS=10)
+    async def test_history_window_fits_the_char_budget(self):
+        await Message.objects.abulk_create(
+            Message(conversation=self.conversation, role=role, content=content)
+            for role, content in [
+                ("user", "question"),
+                ("assistant", "long answer"),
+                ("user", "q2"),
+                ("assistant", "a2"),
+            ]
+        )
+        self.stub.events = ({"type": "done", "response": "a3", "tool_calls": []},)
+
+        await self._send("q3")
+
+        # "long answer" would pass 10 characters, so only q2 and a2 are sent
+        self.assertEqual(
+            self.stub.histories,
+            [
+                [
+                    {"role": "user", "content": "q2"},
+                    {"role": "assistant", "content": "a2"},
+                ]
+            ],
+        )
+
+    async def test_empty_message_is_rejected(self):
+        response = await self.async_client.post("/send/", {"message": "  "})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stub.histories, [])
+        self.assertEqual(await self._rows(), [])
@@ -1,35 +1,59 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+import orjson
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+from django.shortcuts import render, redirect, aget_object_or_404
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
-from asgiref.sync import sync_to_async
 
 
 from .models import Conversation, Message
-from .mcp_client import MCPClient
 
 
-# Initialize MCP client (singleton)
-mcp_client = MCPClient()
+def _ojson(obj, status=200):
+    """JSON response serialized with orjson."""
+    return HttpResponse(
+        orjson.dumps(obj), status=status, content_type="application/json"
+    )
 
 
-def index(request):
-    """Main chat interface"""
-    conversations = Conversation.objects.all()[:10]
+def _sse(event):
+    """One Server-Sent Events message carrying an event as JSON."""
+    return b"data: " + orjson.dumps(event) + b"\n\n"
 
-    # Get or create current conversation
-    conversation_id = request.session.get("current_conversation_id")
 
-    if conversation_id:
-        try:
-            current_conversation = Conversation.objects.get(id=conversation_id)
-        except Conversation.DoesNotExist:
-            current_conversation = Conversation.objects.create(title="New Chat")
-            request.session["current_conversation_id"] = current_conversation.id
-    else:
-        current_conversation = Conversation.objects.create(title="New Chat")
-        request.session["current_conversation_id"] = current_conversation.id
+def _mcp_client():
+    """The app's shared MCP client (see McpChatConfig.mcp_client)."""
+    return apps.get_app_config("mcp_chat").mcp_client
+
 
-    messages = current_conversation.messages.all()
+async def index(request):
+    """Main chat interface"""
+    # Get or create current conversation
+    conversation_id = await request.session.aget("current_conversation_id")
+
+    current_conversation = (
+        await Conversation.objects.filter(id=conversation_id).afirst()
+        if conversation_id
+        else None
+    )
+    if current_conversation is None:
+        current_conversation = await Conversation.objects.acreate(title="New Chat")
+        await request.session.aset("current_conversation_id", current_conversation.id)
+
+    # The sidebar only shows each conversation's title and last update.
+    # Queries are awaited in turn: the async ORM runs them one after another
+    # on the same database thread, so gathering them would not overlap them
+    conversations = [
+        c async for c in Conversation.objects.only("id", "title", "updated_at")[:10]
+    ]
+    messages = [
+        m
+        async for m in current_conversation.messages.only(
+            "role", "content", "tool_calls"
+        )
+    ]
 
     return render(
         request,
@@ -38,80 +62,121 @@ def index(request):
             "conversations": conversations,
             "current_conversation": current_conversation,
             "messages": messages,
-            "available_tools": mcp_client.get_all_tools(),
+            "available_tools": _mcp_client().get_clean_tools_for_api(),
         },
     )
 
 
+async def _load_history(conversation, limit, max_chars):
+    """Latest user/assistant messages of a conversation as role/content rows,
+    newest first, stopping before the content would pass max_chars."""
+    rows = (
+        conversation.messages.filter(role__in=("user", "assistant"))
+        .order_by("-id")
+        .values("role", "content")[:limit]
+    )
+    history = []
+    size = 0
+    async for row in rows:
+        size += len(row["content"])
+        if size > max_chars:
+            break
+        history.append(row)
+    return history
+
+
+async def _set_title(conversation, user_message):
+    """Title a conversation after its first user message. A single UPDATE that
+    only matches while the conversation still has the default title."""
+    title = user_message[:50] + "..." if len(user_message) > 50 else user_message
+    await Conversation.objects.filter(id=conversation.id, title="New Chat").aupdate(
+        title=title, updated_at=timezone.now()
+    )
+
+
 @require_http_methods(["POST"])
 async def send_message(request):
-    """Handle chat message with MCP support (ASYNC!)"""
+    """Handle chat message with MCP support (ASYNC!), streamed back as
+    Server-Sent Events"""
 
     user_message = request.POST.get("message", "").strip()
 
     if not user_message:
-        return JsonResponse({"error": "Empty message"}, status=400)
+        return _ojson({"error": "Empty message"}, status=400)
 
     # Get current conversation (async-safe session access)
-    conversation_id = await sync_to_async(
-        lambda: request.session.get("current_conversation_id")
-    )()
+    conversation_id = await request.session.aget("current_conversation_id")
 
-    # Use sync_to_async for database operations
-    conversation = await sync_to_async(get_object_or_404)(
-        Conversation, id=conversation_id
-    )
+    # Native async ORM calls, no thread hop per query
+    conversation = await aget_object_or_404(Conversation, id=conversation_id)
 
-    # Save user message
-    await sync_to_async(Message.objects.create)(
-        conversation=conversation, role="user", content=user_message
+    # Only the last MCP_HISTORY_TURNS messages, up to MCP_HISTORY_MAX_CHARS, are
+    # sent. The user message is saved together with the reply, so it is not
+    # part of this read.
+    rows = await _load_history(
+        conversation, settings.MCP_HISTORY_TURNS, settings.MCP_HISTORY_MAX_CHARS
     )
 
-    # Get conversation history
-    messages = await sync_to_async(list)(conversation.messages.all())
+    # Build conversation history for MCP client, oldest first
+    history = [
+        {"role": row["role"], "content": row["content"]} for row in reversed(rows)
+    ]
+    # The API expects the messages to open with a user turn
+    if history and history[0]["role"] == "assistant":
+        del history[0]
 
-    # Build conversation history for MCP client
-    history = []
-    for msg in messages[:-1]:  # Exclude the message we just added
-        if msg.role in ["user", "assistant"]:
-            history.append({"role": msg.role, "content": msg.content})
-
-    try:
-        # Call MCP client (this is async!)
-        result = await mcp_client.send_message(user_message, history)
-
-        assistant_response = result["response"]
-        tool_calls = result.get("tool_calls", [])
-
-        # Save assistant message
-        await sync_to_async(Message.objects.create)(
-            conversation=conversation,
-            role="assistant",
-            content=assistant_response,
-            tool_calls=tool_calls if tool_calls else None,
-        )
+    user_msg = Message(conversation=conversation, role="user", content=user_message)
 
-        # Update conversation title if it's the first exchange
-        if await sync_to_async(lambda: conversation.messages.count())() == 2:
-            # Generate title from first message
-            title = (
-                user_message[:50] + "..." if len(user_message) > 50 else user_message
+    async def event_stream():
+        saved = False
+        try:
+            # Forward text, tool calls and errors as the MCP client produces them
+            async for event in _mcp_client().send_message_stream(user_message, history):
+                if event["type"] != "done":
+                    yield _sse(event)
+                    continue
+
+                assistant_response = event["response"]
+                tool_calls = event["tool_calls"]
+
+                # Save both messages in one INSERT, then title the conversation
+                # if it is still untitled
+                await Message.objects.abulk_create(
+                    [
+                        user_msg,
+                        Message(
+                            conversation=conversation,
+                            role="assistant",
+                            content=assistant_response,
+                            tool_calls=tool_calls if tool_calls else None,
+                        ),
+                    ]
+                )
+                await _set_title(conversation, user_message)
+                saved = True
+
+                yield _sse(
+                    {
+                        "type": "done",
+                        "user_message": user_message,
+                        "assistant_response": assistant_response,
+                        "tool_calls": tool_calls,
+                    }
+                )
+
+        except Exception as e:
+            yield _sse(
+                {"type": "error", "error": f"Error processing message: {str(e)}"}
             )
-            conversation.title = title
-            await sync_to_async(conversation.save)()
-
-        return JsonResponse(
-            {
-                "user_message": user_message,
-                "assistant_response": assistant_response,
-                "tool_calls": tool_calls,
-            }
-        )
 
-    except Exception as e:
-        return JsonResponse(
-            {"error": f"Error processing message: {str(e)}"}, status=500
-        )
+        finally:
+            # Keep the user's turn in the conversation even without a reply
+            if not saved:
+                await user_msg.asave()
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    return response
 
 
 def new_conversation(request):
@@ -121,16 +186,19 @@ def new_conversation(request):
     return redirect("index")
 
 
-def switch_conversation(request, conversation_id):
+async def switch_conversation(request, conversation_id):
     """Switch to a different conversation"""
-    conversation = get_object_or_404(Conversation, id=conversation_id)
-    request.session["current_conversation_id"] = conversation.id
+    # Only the id is needed, so just check that the conversation exists
+    if not await Conversation.objects.filter(id=conversation_id).aexists():
+        raise Http404("No Conversation matches the given query.")
+    await request.session.aset("current_conversation_id", conversation_id)
     return redirect("index")
 
 
 def debug_tools(request):
     """Debug view to see available tools"""
-    tools = mcp_client.get_all_tools()
+    mcp_client = _mcp_client()
+    tools = mcp_client.get_clean_tools_for_api()
     resources = mcp_client.get_all_resources()
 
     return render(
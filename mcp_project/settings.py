@@ -20,6 +20,17 @@ load_dotenv()
 # Anthropic API key
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL")
+# Cheap model used to summarize long conversation histories
+ANTHROPIC_SUMMARY_MODEL = os.getenv("ANTHROPIC_SUMMARY_MODEL", "claude-haiku-4-5")
+# Most recent user/assistant messages sent with each chat turn. Keep it well
+# under mcp_client.HISTORY_MAX_MESSAGES (20): the window, the new message and
+# up to four tool rounds (two messages each) must fit, or every turn pays for
+# a summary call
+MCP_HISTORY_TURNS = int(os.getenv("MCP_HISTORY_TURNS", "10"))
+# Character budget for that window. mcp_client estimates 4 characters a token,
+# so this is about 3000 tokens, well under HISTORY_MAX_TOKENS (8000) to leave
+# room for the new message and the tool results of the turn
+MCP_HISTORY_MAX_CHARS = int(os.getenv("MCP_HISTORY_MAX_CHARS", "12000"))
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,6 +51,9 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    # Must come first: replaces runserver with Daphne's ASGI server, so chat
+    # replies stream instead of arriving in one piece at the end
+    "daphne",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -77,6 +91,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "mcp_project.wsgi.application"
+# Served under ASGI (Daphne): async views share one event loop, which keeps
+# streaming responses and the pooled API/HTTP clients alive across requests
+ASGI_APPLICATION = "mcp_project.asgi.application"
 
 
 # Database